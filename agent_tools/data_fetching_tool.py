@@ -1,21 +1,33 @@
 import yfinance as yf
 import pandas_datareader.data as pdr
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import datetime
+import functools
+import httpx
+import threading
+import time
+from cachetools import TTLCache, cached
+from curl_cffi import requests as curl_requests
 from pydantic import BaseModel, Field, field_validator, RootModel
-from typing import List, Dict, Any, Literal, Union, Optional
+from agent_tools.tool_pandas import frame_to_arrow_b64
+from typing import Annotated, List, Dict, Any, Literal, Union, Optional
 import io
+from concurrent.futures import ThreadPoolExecutor
 
 #  1. PYDANTIC SCHEMAS 
 class GetCurrentPriceInput(BaseModel):
     operation: Literal["get_current_price"]
-    ticker: str = Field(description="The stock ticker (e.g., 'AAPL', 'MSFT').")
+    ticker: Union[str, List[str]] = Field(description="The stock ticker (e.g., 'AAPL') or a list of tickers (e.g., ['AAPL', 'MSFT']).")
 
 class GetHistoricalDataInput(BaseModel):
     operation: Literal["get_historical_data"]
-    ticker: str = Field(description="The stock ticker.")
+    ticker: Union[str, List[str]] = Field(description="The stock ticker, or a list of tickers to fetch in one batch.")
     period: str = Field("1y", description="Duration (e.g., '1mo', '1y').")
     interval: str = Field("1d", description="Frequency (e.g., '1d', '1wk').")
+    columns: Optional[List[str]] = Field(None, description="Subset of columns to return (e.g., ['Close', 'Volume']). Default: all OHLCV columns.")
+    output_format: Literal["csv", "arrow"] = Field("csv", description="'csv' for readable text, 'arrow' for base64 Arrow IPC bytes (tool-to-tool transport).")
 
 class GetCompanyInfoInput(BaseModel):
     operation: Literal["get_company_info"]
@@ -27,40 +39,153 @@ class GetEconomicDataInput(BaseModel):
     source: Literal["fred"] = Field("fred")
     start_date: Optional[str] = Field(None)
     end_date: Optional[str] = Field(None)
+    output_format: Literal["csv", "arrow"] = Field("csv", description="'csv' for readable text, 'arrow' for base64 Arrow IPC bytes (tool-to-tool transport).")
 
 #  2. THE FIX: ROOT MODEL WRAPPER 
 class AnyDataFetchingInput(RootModel):
-    root: Union[
-        GetCurrentPriceInput,
-        GetHistoricalDataInput,
-        GetCompanyInfoInput,
-        GetEconomicDataInput
+    # Tagged on 'operation' so pydantic jumps straight to the matching schema.
+    root: Annotated[
+        Union[
+            GetCurrentPriceInput,
+            GetHistoricalDataInput,
+            GetCompanyInfoInput,
+            GetEconomicDataInput
+        ],
+        Field(discriminator="operation")
     ]
 
-#  3. CORE IMPLEMENTATION FUNCTIONS  
+#  3. SHARED YAHOO SESSION + TICKER POOL 
+# One keep-alive session for every Yahoo call (yfinance requires a curl_cffi session).
+_SESSION = curl_requests.Session(impersonate="chrome")
+# Matches the price TTL below: a pooled Ticker memoizes its fast_info/info values.
+_TICKER_TTL_SECONDS = 60
+# Concurrent quote lookups for a ticker list.
+_PRICE_BATCH_WORKERS = 8
+
+@functools.lru_cache(maxsize=512)
+def _pooled_ticker(ticker: str, ttl_bucket: int) -> yf.Ticker:
+    return yf.Ticker(ticker, session=_SESSION)
+
+def _ticker(ticker: str) -> yf.Ticker:
+    """Reuses Ticker objects (and their fetched data) for up to _TICKER_TTL_SECONDS."""
+    return _pooled_ticker(ticker.upper(), int(time.time() // _TICKER_TTL_SECONDS))
+
+#  4. RESULT CACHES 
+# TTLs per data type: quotes move, company profiles and FRED series barely do.
+_PRICE_CACHE = TTLCache(maxsize=1024, ttl=60)
+_INFO_CACHE = TTLCache(maxsize=1024, ttl=3600)
+_ECON_CACHE = TTLCache(maxsize=512, ttl=900)
+# Failures are remembered briefly so a transient 429 isn't retried in a tight agent loop.
+_NEG_CACHE = TTLCache(maxsize=256, ttl=10)
+_CACHE_LOCK = threading.Lock()
+
+def _negative_cached(fn):
+    @functools.wraps(fn)
+    def wrapper(*args):
+        key = (fn.__name__, *args)
+        with _CACHE_LOCK:
+            failure = _NEG_CACHE.get(key)
+        if failure is not None:
+            raise failure
+        try:
+            return fn(*args)
+        except Exception as e:
+            with _CACHE_LOCK:
+                _NEG_CACHE[key] = e
+            raise
+    return wrapper
+
+def _copied(fn):
+    """Hands each caller its own dict, so mutating a result can't corrupt the cached one."""
+    @functools.wraps(fn)
+    def wrapper(*args):
+        return dict(fn(*args))
+    return wrapper
+
+#  5. CORE IMPLEMENTATION FUNCTIONS  
+def _serialize_frame(df: pd.DataFrame, output_format: str) -> Dict[str, Any]:
+    if output_format == "arrow":
+        return {"result_arrow_b64": frame_to_arrow_b64(df)}
+    csv_buffer = io.StringIO()
+    df.to_csv(csv_buffer)
+    return {"result_csv": csv_buffer.getvalue()}
+
+# fast_info is served from the lightweight chart endpoint instead of the full quoteSummary blob.
+_FAST_INFO_KEYS = {"lastPrice": "current_price", "previousClose": "previous_close", "open": "open", "dayHigh": "day_high", "dayLow": "day_low", "lastVolume": "volume", "marketCap": "market_cap"}
+
+@_copied
+@cached(cache=_PRICE_CACHE, lock=_CACHE_LOCK)
+@_negative_cached
 def _get_current_price(ticker: str) -> Dict[str, Any]:
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    required_keys = {"currentPrice": "current_price", "previousClose": "previous_close", "open": "open", "dayHigh": "day_high", "dayLow": "day_low", "volume": "volume", "marketCap": "market_cap"}
+    stock = _ticker(ticker)
+    info = stock.fast_info
     result_data = {"ticker": ticker}
-    for key, new_key in required_keys.items():
-        if key in info: result_data[new_key] = info[key]
+    for key, new_key in _FAST_INFO_KEYS.items():
+        try:
+            value = info[key]
+        except Exception:
+            continue
+        if value is not None: result_data[new_key] = value
     if "current_price" not in result_data:
         hist = stock.history(period="1d")
         if not hist.empty: result_data["current_price"] = hist['Close'].iloc[-1]
         else: raise ValueError("Could not retrieve current price.")
     return result_data
 
-def _get_historical_data(ticker: str, period: str, interval: str) -> Dict[str, Any]:
-    stock = yf.Ticker(ticker)
-    hist_df = stock.history(period=period, interval=interval)
+def _shape_history(hist_df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """
+    Keeps only the requested columns and downcasts float64 prices to float32 to halve the payload.
+    Volume stays float64: float32 cannot represent counts above ~16.7M exactly.
+    """
+    if columns:
+        lookup = {c.lower(): c for c in hist_df.columns}
+        missing = [c for c in columns if c.lower() not in lookup]
+        if missing: raise ValueError(f"Unknown columns {missing}. Available columns: {list(hist_df.columns)}")
+        hist_df = hist_df[[lookup[c.lower()] for c in columns]]
+    float_cols = [c for c in hist_df.select_dtypes("float64").columns if c != "Volume"]
+    return hist_df.astype({c: "float32" for c in float_cols}) if float_cols else hist_df
+
+def _get_historical_data(ticker: str, period: str, interval: str, output_format: str = "csv", columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    stock = _ticker(ticker)
+    # No dividend/split join and no pre/post-market bars; errors raise instead of returning empty.
+    hist_df = stock.history(period=period, interval=interval, prepost=False, actions=False, raise_errors=True)
     if hist_df.empty: raise ValueError(f"No historical data found for {ticker}.")
-    csv_buffer = io.StringIO()
-    hist_df.to_csv(csv_buffer)
-    return {"ticker": ticker, "period": period, "interval": interval, "rows": len(hist_df), "result_csv": csv_buffer.getvalue()}
+    hist_df = _shape_history(hist_df, columns)
+    return {"ticker": ticker, "period": period, "interval": interval, "rows": len(hist_df), **_serialize_frame(hist_df, output_format)}
+
+def _current_price_or_error(symbol: str) -> Dict[str, Any]:
+    try:
+        return _get_current_price(symbol)
+    except Exception as e:
+        return {"ticker": symbol, "error": str(e)}
+
+def _get_current_prices(tickers: List[str]) -> Dict[str, Any]:
+    # yf.download has no market cap and yf.Tickers still reads fast_info one symbol at a time,
+    # so the per-ticker (cached) lookups run side by side on the shared session instead.
+    with ThreadPoolExecutor(max_workers=min(_PRICE_BATCH_WORKERS, len(tickers)) or 1) as executor:
+        quotes = list(executor.map(_current_price_or_error, tickers))
+    return {"tickers": tickers, "results": dict(zip(tickers, quotes))}
 
+def _get_historical_data_batch(tickers: List[str], period: str, interval: str, output_format: str = "csv", columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    # yf.download upper-cases symbols in its columns; match that, as _ticker does for single fetches.
+    tickers = [t.upper() for t in tickers]
+    # One yf.download call; yfinance fetches the symbols in parallel on its own thread pool.
+    data = yf.download(tickers, period=period, interval=interval, group_by="ticker", threads=True, progress=False, prepost=False, actions=False, session=_SESSION)
+    if data.empty: raise ValueError(f"No historical data found for {', '.join(tickers)}.")
+    results = {}
+    for symbol in tickers:
+        if symbol not in data.columns.get_level_values(0):
+            results[symbol] = {"ticker": symbol, "error": f"No historical data found for {symbol}."}
+            continue
+        hist_df = _shape_history(data[symbol].dropna(how="all"), columns)
+        results[symbol] = {"ticker": symbol, "rows": len(hist_df), **_serialize_frame(hist_df, output_format)}
+    return {"tickers": tickers, "period": period, "interval": interval, "results": results}
+
+@_copied
+@cached(cache=_INFO_CACHE, lock=_CACHE_LOCK)
+@_negative_cached
 def _get_company_info(ticker: str) -> Dict[str, Any]:
-    stock = yf.Ticker(ticker)
+    stock = _ticker(ticker)
     info = stock.info
     safe_keys = ["sector", "industry", "longName", "country", "website", "marketCap", "beta", "trailingPE", "forwardPE", "bookValue", "priceToBook", "dividendYield", "payoutRatio"]
     result_data = {"ticker": ticker}
@@ -69,17 +194,37 @@ def _get_company_info(ticker: str) -> Dict[str, Any]:
     if len(result_data) == 1: raise ValueError(f"Could not retrieve info for {ticker}.")
     return result_data
 
-def _get_economic_data(series_id: str, source: str, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+_FRED_CSV_URL = "https://fred.stlouisfed.org/graph/fredgraph.csv"
+_HTTP_CLIENT = httpx.Client(timeout=30, limits=httpx.Limits(max_keepalive_connections=8))
+
+def _fetch_fred_csv(series_id: str, start: datetime.datetime, end: datetime.datetime) -> pd.DataFrame:
+    """Single request against FRED's CSV export, parsed with Arrow (FRED marks gaps with '.')."""
+    response = _HTTP_CLIENT.get(_FRED_CSV_URL, params={"id": series_id, "cosd": start.strftime('%Y-%m-%d'), "coed": end.strftime('%Y-%m-%d')})
+    response.raise_for_status()
+    convert_options = pacsv.ConvertOptions(null_values=["."], strings_can_be_null=True)
+    df = pacsv.read_csv(pa.BufferReader(response.content), convert_options=convert_options).to_pandas()
+    if series_id not in df.columns: raise ValueError(f"Unexpected FRED response for {series_id}.")
+    date_col = df.columns[0]
+    df = df.set_index(pd.to_datetime(df[date_col])).drop(columns=[date_col])
+    df.index.name = "DATE"
+    return df
+
+@_copied
+@cached(cache=_ECON_CACHE, lock=_CACHE_LOCK)
+@_negative_cached
+def _get_economic_data(series_id: str, source: str, start_date: Optional[str], end_date: Optional[str], output_format: str = "csv") -> Dict[str, Any]:
     start = datetime.datetime.strptime(start_date, '%Y-%m-%d') if start_date else datetime.datetime(2020, 1, 1)
     end = datetime.datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.datetime.now()
-    df = pdr.DataReader(series_id, source, start, end)
+    try:
+        df = _fetch_fred_csv(series_id, start, end)
+    except Exception:
+        # The fredgraph endpoint is undocumented; pandas_datareader stays as the fallback.
+        df = pdr.DataReader(series_id, source, start, end)
     if df.empty: raise ValueError(f"No data found for {series_id}.")
     recent_value = df.iloc[-1].to_dict()
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer)
-    return {"series_id": series_id, "source": source, "most_recent_data": recent_value, "rows": len(df), "result_csv": csv_buffer.getvalue()}
+    return {"series_id": series_id, "source": source, "most_recent_data": recent_value, "rows": len(df), **_serialize_frame(df, output_format)}
 
-# --- 4. REFACTORED TOOL ENTRYPOINT ---
+# --- 6. REFACTORED TOOL ENTRYPOINT ---
 def data_fetching_tool(tool_input: AnyDataFetchingInput) -> Dict[str, Any]:
     
     """
@@ -91,13 +236,19 @@ def data_fetching_tool(tool_input: AnyDataFetchingInput) -> Dict[str, Any]:
         operation = actual_input.operation
         
         if operation == "get_current_price":
-            result = _get_current_price(actual_input.ticker)
+            if isinstance(actual_input.ticker, list):
+                result = _get_current_prices(actual_input.ticker)
+            else:
+                result = _get_current_price(actual_input.ticker)
         elif operation == "get_historical_data":
-            result = _get_historical_data(actual_input.ticker, actual_input.period, actual_input.interval)
+            if isinstance(actual_input.ticker, list):
+                result = _get_historical_data_batch(actual_input.ticker, actual_input.period, actual_input.interval, actual_input.output_format, actual_input.columns)
+            else:
+                result = _get_historical_data(actual_input.ticker, actual_input.period, actual_input.interval, actual_input.output_format, actual_input.columns)
         elif operation == "get_company_info":
             result = _get_company_info(actual_input.ticker)
         elif operation == "get_economic_data":
-            result = _get_economic_data(actual_input.series_id, actual_input.source, actual_input.start_date, actual_input.end_date)
+            result = _get_economic_data(actual_input.series_id, actual_input.source, actual_input.start_date, actual_input.end_date, actual_input.output_format)
         else:
             return {"error": f"Unknown operation: {operation}"}
 
@@ -106,4 +257,4 @@ def data_fetching_tool(tool_input: AnyDataFetchingInput) -> Dict[str, Any]:
     except (ValueError, TypeError) as e:
         return {"error": str(e), "operation": getattr(tool_input.root, 'operation', 'unknown')}
     except Exception as e:
-        return {"error": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Unexpected error: {str(e)}"}
@@ -1,8 +1,14 @@
 import os
+import csv
+import hashlib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from cachetools import LRUCache
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from transformers import pipeline, Pipeline
+from agent_tools.tool_pandas import read_csv_with_fallback
 
 # --- CONFIGURATION ---
 
@@ -17,6 +23,26 @@ os.makedirs(TABLE_DATA_ROOT, exist_ok=True)
 _tapas_pipeline: Optional[Pipeline] = None
 _tapas_model_name = "google/tapas-base-finetuned-wtq"
 
+# Agent retries often re-ask the same question of the same table.
+# Both caches are keyed by the file's content hash, so edited files miss.
+_TABLE_CACHE: LRUCache = LRUCache(maxsize=32)
+_QA_CACHE: LRUCache = LRUCache(maxsize=512)
+
+def _file_sha1(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha1').hexdigest()
+
+def _read_table_as_strings(path: str) -> pd.DataFrame:
+    """Arrow's threaded CSV parser, with every column kept as raw text for TAPAS."""
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in header},
+        strings_can_be_null=True
+    )
+    # Ragged Grobid tables and duplicate headers fall back to pd.read_csv, as before.
+    return read_csv_with_fallback(path=path, convert_options=convert_options, dtype=str)
+
 def _ensure_tapas_models():
     """
     Lazy-loads the TAPAS pipeline on first use.
@@ -24,11 +50,16 @@ def _ensure_tapas_models():
     global _tapas_pipeline
     if _tapas_pipeline is None:
         try:
-            print(f"Lazy-loading TAPAS model: {_tapas_model_name}...")
+            import torch
+            device = 0 if torch.cuda.is_available() else -1
+            print(f"Lazy-loading TAPAS model: {_tapas_model_name} (device={device})...")
             _tapas_pipeline = pipeline(
                 "table-question-answering",
                 model=_tapas_model_name,
-                tokenizer=_tapas_model_name
+                tokenizer=_tapas_model_name,
+                device=device,
+                torch_dtype=torch.float16 if device >= 0 else torch.float32,
+                model_kwargs={"low_cpu_mem_usage": True}
             )
             print("TAPAS model loaded successfully.")
         except ImportError:
@@ -55,8 +86,52 @@ class TableQAInput(BaseModel):
         )
     )
 
+class TableQABatchInput(BaseModel):
+    """
+    Input schema for the table_qa_batch_tool.
+    """
+    queries: List[str] = Field(
+        min_length=1,
+        description="The natural language questions to ask the same table."
+    )
+    csv_path: str = Field(
+        description=(
+            "The relative path to the structured .csv file. "
+            "This path is found in the 'table_struct_path' metadata of a 'table_text' chunk."
+        )
+    )
+
 #  2. THE TOOL IMPLEMENTATION 
 
+def _load_table(csv_path: str) -> Tuple[str, pd.DataFrame]:
+    """
+    Resolves 'csv_path' inside the data root and returns (content hash, table).
+    """
+    # Verify the CSV path is inside the allowed data root.
+    full_path = os.path.abspath(
+        os.path.join(TABLE_DATA_ROOT, csv_path)
+    )
+    
+    if not full_path.startswith(TABLE_DATA_ROOT):
+        raise PermissionError(
+            f"Access denied: Path '{csv_path}' is outside "
+            f"the allowed data directory '{TABLE_DATA_ROOT}'."
+        )
+        
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(
+            f"File not found: {csv_path}. "
+            f"Full path checked: {full_path}"
+        )
+
+    # Memoized by content hash
+    file_hash = _file_sha1(full_path)
+    table_df = _TABLE_CACHE.get(file_hash)
+    if table_df is None:
+        table_df = _read_table_as_strings(full_path)
+        _TABLE_CACHE[file_hash] = table_df
+    return file_hash, table_df
+
 def table_qa_tool(tool_input: TableQAInput) -> Dict[str, Any]:
     """
     Answers a natural language query about a specific structured table
@@ -73,33 +148,18 @@ def table_qa_tool(tool_input: TableQAInput) -> Dict[str, Any]:
             
             raise RuntimeError("TAPAS pipeline could not be initialized.")
 
-        # 2. 
-        # Verify the CSV path is inside the allowed data root.
-        full_path = os.path.abspath(
-            os.path.join(TABLE_DATA_ROOT, tool_input.csv_path)
-        )
-        
-        if not full_path.startswith(TABLE_DATA_ROOT):
-            raise PermissionError(
-                f"Access denied: Path '{tool_input.csv_path}' is outside "
-                f"the allowed data directory '{TABLE_DATA_ROOT}'."
-            )
-            
-        if not os.path.exists(full_path):
-            raise FileNotFoundError(
-                f"File not found: {tool_input.csv_path}. "
-                f"Full path checked: {full_path}"
-            )
-
-        # 3. Load the table
-        
-        table_df = pd.read_csv(full_path, dtype=str)
+        # 2. Load the table
+        file_hash, table_df = _load_table(tool_input.csv_path)
 
-        # 4. Run the TAPAS pipeline
-        tapas_result = _tapas_pipeline(
-            table=table_df,
-            query=tool_input.query
-        )
+        # 3. Run the TAPAS pipeline
+        cache_key = (file_hash, tool_input.query)
+        tapas_result = _QA_CACHE.get(cache_key)
+        if tapas_result is None:
+            tapas_result = _tapas_pipeline(
+                table=table_df,
+                query=tool_input.query
+            )
+            _QA_CACHE[cache_key] = tapas_result
         
         
         #  SUCCESS: Return structured output 
@@ -121,4 +181,54 @@ def table_qa_tool(tool_input: TableQAInput) -> Dict[str, Any]:
         return {
             "error": f"An unexpected error occurred in table_qa_tool: {str(e)}",
             "inputs": tool_input.model_dump()
-        }
\ No newline at end of file
+        }
+
+def table_qa_batch_tool(tool_input: TableQABatchInput) -> Dict[str, Any]:
+    """
+    Answers several natural language queries about one structured table
+    with a single batched TAPAS call.
+    
+    This tool follows the I/O contract:
+    - Input: A Pydantic model ('TableQABatchInput') with validated arguments.
+    - Output: A dictionary with either a 'results' or 'error' key.
+    """
+    try:
+        _ensure_tapas_models()
+        if _tapas_pipeline is None:
+            raise RuntimeError("TAPAS pipeline could not be initialized.")
+
+        file_hash, table_df = _load_table(tool_input.csv_path)
+
+        # Only the uncached queries go through the model, in one batch.
+        pending = [q for q in dict.fromkeys(tool_input.queries) if (file_hash, q) not in _QA_CACHE]
+        if pending:
+            batch_output = _tapas_pipeline(table=table_df, query=pending)
+            if isinstance(batch_output, dict):
+                batch_output = [batch_output]
+            for query, tapas_result in zip(pending, batch_output):
+                _QA_CACHE[(file_hash, query)] = tapas_result
+
+        results = []
+        for query in tool_input.queries:
+            tapas_result = _QA_CACHE.get((file_hash, query)) or {}
+            results.append({
+                "query": query,
+                "result": tapas_result.get("answer"),
+                "full_tapas_output": tapas_result
+            })
+
+        return {
+            "results": results,
+            "source_csv": tool_input.csv_path
+        }
+
+    except (ValueError, TypeError, PermissionError, FileNotFoundError) as e:
+        return {
+            "error": str(e),
+            "inputs": tool_input.model_dump()
+        }
+    except Exception as e:
+        return {
+            "error": f"An unexpected error occurred in table_qa_batch_tool: {str(e)}",
+            "inputs": tool_input.model_dump()
+        }
@@ -1,3 +1,4 @@
+import math
 from pydantic import BaseModel, Field, model_validator
 from typing import List, Literal, Dict, Any
 
@@ -42,27 +43,22 @@ def calculator(tool_input: CalculatorInput) -> Dict[str, Any]:
         
         
         if operation == "add":
-            result = sum(numbers)
+            result = math.fsum(numbers)
 
         elif operation == "subtract":
             
-            result = numbers[0]
-            for n in numbers[1:]:
-                result -= n
+            result = numbers[0] - math.fsum(numbers[1:])
 
         elif operation == "multiply":
-            result = 1
-            for n in numbers:
-                result *= n
+            result = math.prod(numbers)
 
         elif operation == "divide":
             
-            result = numbers[0]
-            for n in numbers[1:]:
-                if n == 0:
-                    
-                    raise ValueError("Division by zero is not allowed.")
-                result /= n
+            divisors = numbers[1:]
+            if 0.0 in divisors:
+                
+                raise ValueError("Division by zero is not allowed.")
+            result = numbers[0] / math.prod(divisors)
         return {
             "result": result,
             "operation": operation,
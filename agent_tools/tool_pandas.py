@@ -1,15 +1,25 @@
+import numpy as np
 import pandas as pd
-import pydantic
-from typing import List, Dict, Any, Literal, Union, Optional
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+from cachetools import LRUCache
+from typing import Annotated, List, Dict, Any, Literal, Union, Optional
 from pydantic import BaseModel, Field, model_validator
 import io
 import os
 import hashlib
+import base64
+import operator
 import re
 
 
 DATA_ROOT = os.path.abspath(os.getenv("PANDAS_DATA_ROOT", "./csv_data"))
 
+# Agents often replay the same sub-plan; results are keyed by source hash + path + operations.
+_RESULT_CACHE: LRUCache = LRUCache(maxsize=128)
+
 
 os.makedirs(DATA_ROOT, exist_ok=True)
 
@@ -97,10 +107,11 @@ class PandasToolInput(BaseModel):
     """
     data_path: Optional[str] = Field(None, description="Relative path to a CSV file in the sandboxed data root.")
     csv_text: Optional[str] = Field(None, description="A string containing the raw CSV data.")
-    operations: List[pydantic.SerializeAsAny[AnyOperation]] = Field(
+    operations: List[Annotated[AnyOperation, Field(discriminator="action")]] = Field(
         description="A list of analysis operations to perform in sequence."
     )
     max_output_rows: int = Field(100, description="The maximum number of rows to return in the final CSV.")
+    output_format: Literal["csv", "arrow"] = Field("csv", description="'csv' for readable text, 'arrow' for base64 Arrow IPC bytes (tool-to-tool transport).")
 
     @model_validator(mode='after')
     def check_data_source(self) -> 'PandasToolInput':
@@ -112,31 +123,82 @@ class PandasToolInput(BaseModel):
         return self
 # --- 2. HELPER FUNCTIONS ---
 
-def _read_csv(data_root: str, data_path: Optional[str], csv_text: Optional[str]) -> (pd.DataFrame, Dict[str, Any]):
+def frame_to_arrow_b64(df: pd.DataFrame) -> str:
+    """Serializes a DataFrame to LZ4-compressed Arrow IPC (Feather V2), base64-encoded for JSON transport."""
+    sink = pa.BufferOutputStream()
+    feather.write_feather(df, sink, compression="lz4", chunksize=65536)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+
+# Multi-threaded Arrow parse; 8 MiB blocks keep every core busy on large files.
+_CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+
+def read_csv_with_fallback(path: Optional[str] = None, text: Optional[str] = None, convert_options: Optional[pacsv.ConvertOptions] = None, **pandas_kwargs) -> pd.DataFrame:
+    """
+    Parses a CSV file or string with Arrow's threaded reader, deferring to pd.read_csv where they disagree:
+    ragged rows (pandas pads them with NaN) and duplicate headers (pandas renames them 'col.1').
+    Columns Arrow infers as dates/timestamps are re-read as text, as pandas leaves them.
+    """
+    def arrow_source():
+        return path if path is not None else pa.BufferReader(text.encode('utf-8'))
+
+    def pandas_read():
+        return pd.read_csv(path if path is not None else io.StringIO(text), **pandas_kwargs)
+
+    try:
+        table = pacsv.read_csv(arrow_source(), read_options=_CSV_READ_OPTIONS, convert_options=convert_options)
+    except pa.ArrowInvalid:
+        return pandas_read()
+    if len(set(table.column_names)) != len(table.column_names):
+        return pandas_read()
+    temporal = {field.name: pa.string() for field in table.schema if pa.types.is_temporal(field.type)}
+    if temporal and convert_options is None:
+        text_options = pacsv.ConvertOptions(column_types=temporal, strings_can_be_null=True)
+        table = pacsv.read_csv(arrow_source(), read_options=_CSV_READ_OPTIONS, convert_options=text_options)
+    return table.to_pandas(self_destruct=True)
+
+def _csv_preview(csv_text: str, n_rows: int) -> str:
+    """Header plus the first 'n_rows' lines, sliced from an already-serialized CSV."""
+    end = -1
+    for _ in range(n_rows + 1):
+        end = csv_text.find("\n", end + 1)
+        if end == -1:
+            return csv_text
+    return csv_text[:end + 1]
+
+def _resolve_data_path(data_root: str, data_path: str) -> str:
+    """Resolves 'data_path' inside the sandboxed data root."""
+    full_path = os.path.abspath(os.path.join(data_root, data_path))
+    if not full_path.startswith(data_root):
+        raise PermissionError(f"Access denied: Path '{data_path}' is outside the allowed data directory.")
+    
+    if not os.path.exists(full_path):
+        raise FileNotFoundError(f"File not found at '{data_path}'.")
+    return full_path
+
+def _source_sha1(data_root: str, data_path: Optional[str], csv_text: Optional[str]) -> str:
+    """Hashes the CSV source, streaming files rather than reading them whole."""
+    if data_path:
+        with open(_resolve_data_path(data_root, data_path), 'rb') as f:
+            return hashlib.file_digest(f, 'sha1').hexdigest()
+    return hashlib.sha1((csv_text or "").encode('utf-8')).hexdigest()
+
+def _read_csv(data_root: str, data_path: Optional[str], csv_text: Optional[str], source_hash: Optional[str] = None) -> (pd.DataFrame, Dict[str, Any]):
     """Loads a DataFrame and generates initial metadata."""
     meta = {}
     df = pd.DataFrame()
     if data_path:
         
-        full_path = os.path.abspath(os.path.join(data_root, data_path))
-        if not full_path.startswith(data_root):
-            raise PermissionError(f"Access denied: Path '{data_path}' is outside the allowed data directory.")
-        
-        if not os.path.exists(full_path):
-            raise FileNotFoundError(f"File not found at '{data_path}'.")
-        
-        df = pd.read_csv(full_path)
+        full_path = _resolve_data_path(data_root, data_path)
+        df = read_csv_with_fallback(path=full_path)
         meta["source_type"] = "path"
         meta["source_name"] = data_path
-        with open(full_path, 'rb') as f:
-            meta["file_hash_sha1"] = hashlib.sha1(f.read()).hexdigest()
             
     elif csv_text:
-        df = pd.read_csv(io.StringIO(csv_text))
+        df = read_csv_with_fallback(text=csv_text)
         meta["source_type"] = "text"
         meta["source_name"] = "csv_text"
-        meta["file_hash_sha1"] = hashlib.sha1(csv_text.encode('utf-8')).hexdigest()
-        
+    
+    meta["file_hash_sha1"] = source_hash or _source_sha1(data_root, data_path, csv_text)
     meta["initial_rows"] = len(df)
     meta["initial_cols"] = len(df.columns)
     return df, meta
@@ -145,13 +207,12 @@ def _normalize_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Converts object columns that look numeric into actual numbers."""
     for col in df.select_dtypes(include=['object']).columns:
         try:
-            cleaned_col = (
-                df[col]
-                .astype(str)
-                .str.replace(r"[\$,]", "", regex=True)
-                .str.strip()
-                .str.replace(r"\((.*)\)", r"-\1", regex=True)
-            )
+            # Strip '$' / ',' and turn '(123)' into '-123' with Arrow's vectorized string kernels.
+            cleaned = pa.array(df[col].astype(str), type=pa.string())
+            cleaned = pc.replace_substring_regex(cleaned, pattern=r"[\$,]", replacement="")
+            cleaned = pc.utf8_trim_whitespace(cleaned)
+            cleaned = pc.replace_substring_regex(cleaned, pattern=r"\((.*)\)", replacement=r"-\1")
+            cleaned_col = pd.Series(cleaned.to_numpy(zero_copy_only=False), index=df.index)
             
             numeric_col = pd.to_numeric(cleaned_col, errors='coerce')
             
@@ -179,30 +240,77 @@ def _do_select(df: pd.DataFrame, colmap: Dict[str, str], op: SelectOp) -> (pd.Da
     resolved_cols = [_resolve_col(c, colmap) for c in op.columns]
     return df[resolved_cols], {}
 
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+def _condition_operand(series: pd.Series):
+    """Plain numeric columns compare as raw ndarrays; everything else keeps pandas semantics."""
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+        return series.to_numpy()
+    return series
+
+def _as_bool_array(cond) -> np.ndarray:
+    if isinstance(cond, pd.Series):
+        return cond.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(cond, dtype=bool)
+
+def _contains_mask(series: pd.Series, needle: Any) -> np.ndarray:
+    """Case-insensitive literal substring match using Arrow's SIMD string kernel."""
+    try:
+        # Pure-string columns convert without a per-cell str() cast.
+        arr = pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arr = pa.array(series.astype(str), type=pa.string())
+    matched = pc.match_substring(arr, str(needle), ignore_case=True)
+    return matched.fill_null(False).to_numpy(zero_copy_only=False)
+
 def _do_filter(df: pd.DataFrame, colmap: Dict[str, str], op: FilterOp) -> (pd.DataFrame, Dict[str, Any]):
-    mask = pd.Series(True, index=df.index)
+    masks = []
     for c in op.conditions:
         col = _resolve_col(c.col, colmap)
         op_str = c.op
         val = c.value
         
-        if op_str == "==": mask &= (df[col] == val)
-        elif op_str == "!=": mask &= (df[col] != val)
-        elif op_str == ">": mask &= (df[col] > val)
-        elif op_str == "<": mask &= (df[col] < val)
-        elif op_str == ">=": mask &= (df[col] >= val)
-        elif op_str == "<=": mask &= (df[col] <= val)
-        elif op_str == "isin": mask &= (df[col].isin(val))
-        elif op_str == "notin": mask &= (~df[col].isin(val))
-        elif op_str == "contains": mask &= (df[col].astype(str).str.contains(str(val), case=False, na=False))
+        compare = _COMPARISONS.get(op_str)
+        if compare is not None: masks.append(_as_bool_array(compare(_condition_operand(df[col]), val)))
+        elif op_str == "isin": masks.append(_as_bool_array(df[col].isin(val)))
+        elif op_str == "notin": masks.append(~_as_bool_array(df[col].isin(val)))
+        elif op_str == "contains": masks.append(_contains_mask(df[col], val))
         else: raise ValueError(f"Unsupported filter operation: {op_str}")
-            
-    return df[mask], {"filtered_rows": len(df[mask])}
+    
+    # One contiguous reduction instead of re-aligning a Series per condition.
+    mask = np.logical_and.reduce(masks) if masks else np.ones(len(df), dtype=bool)
+    filtered = df[mask]
+    return filtered, {"filtered_rows": len(filtered)}
 
 def _do_sort(df: pd.DataFrame, colmap: Dict[str, str], op: SortOp) -> (pd.DataFrame, Dict[str, Any]):
     by_cols = [_resolve_col(c, colmap) for c in op.by]
     return df.sort_values(by=by_cols, ascending=op.ascending), {}
 
+def _do_sort_head(df: pd.DataFrame, colmap: Dict[str, str], sort_op: SortOp, head_op: HeadOp) -> (pd.DataFrame, Dict[str, Any]):
+    """Fused sort -> head: a partial top-n selection instead of sorting every row."""
+    by_cols = [_resolve_col(c, colmap) for c in sort_op.by]
+    ascending = sort_op.ascending
+    if isinstance(ascending, list) and len(set(ascending)) == 1:
+        ascending = ascending[0]
+    
+    numeric_keys = all(
+        pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c]) for c in by_cols
+    )
+    if isinstance(ascending, bool) and numeric_keys and head_op.n >= 0:
+        top = df.nsmallest(head_op.n, by_cols) if ascending else df.nlargest(head_op.n, by_cols)
+        # nsmallest/nlargest drop NaN keys, whereas sort_values puts them last.
+        if len(top) == min(head_op.n, len(df)):
+            return top, {"fused": "sort+head"}
+    
+    return df.sort_values(by=by_cols, ascending=sort_op.ascending).head(head_op.n), {"fused": "sort+head"}
+
 def _do_head(df: pd.DataFrame, colmap: Dict[str, str], op: HeadOp) -> (pd.DataFrame, Dict[str, Any]):
     return df.head(op.n), {}
 
@@ -218,13 +326,20 @@ def _do_groupby_agg(df: pd.DataFrame, colmap: Dict[str, str], op: GroupByAggOp)
         resolved_col = _resolve_col(col, colmap)
         resolved_aggs[resolved_col] = agg_func
         
-    grouped = df.groupby(by=by_cols).agg(resolved_aggs)
+    # Categorical keys hash each distinct label once; observed=True skips unseen key combinations.
+    categorical_keys = {c: "category" for c in by_cols if df[c].dtype == object}
+    if categorical_keys:
+        df = df.astype(categorical_keys)
+    grouped = df.groupby(by=by_cols, observed=True).agg(resolved_aggs)
     
     
     if isinstance(grouped.columns, pd.MultiIndex):
         grouped.columns = ['_'.join(col).strip() for col in grouped.columns.values]
-        
-    return grouped.reset_index(), {}
+    
+    # Hand plain object keys back so later filter/fillna ops see the original dtype.
+    result = grouped.reset_index()
+    restore = {c: object for c in categorical_keys if c in result.columns}
+    return (result.astype(restore) if restore else result), {}
 
 def _do_rename(df: pd.DataFrame, colmap: Dict[str, str], op: RenameOp) -> (pd.DataFrame, Dict[str, Any]):
     resolved_map = {_resolve_col(old, colmap): new for old, new in op.columns.items()}
@@ -237,22 +352,22 @@ def _do_dropna(df: pd.DataFrame, colmap: Dict[str, str], op: DropNAOp) -> (pd.Da
 def _do_fillna(df: pd.DataFrame, colmap: Dict[str, str], op: FillNAOp) -> (pd.DataFrame, Dict[str, Any]):
     subset = [_resolve_col(c, colmap) for c in op.subset] if op.subset else None
     if subset:
-        df[subset] = df[subset].fillna(value=op.value)
-        return df, {}
+        return df.fillna(value={c: op.value for c in subset}), {}
     else:
         return df.fillna(value=op.value), {}
 
 def _do_compute(df: pd.DataFrame, colmap: Dict[str, str], op: ComputeOp) -> (pd.DataFrame, Dict[str, Any]):
-    col1 = df[_resolve_col(op.col1, colmap)]
-    col2 = df[_resolve_col(op.col2, colmap)] if isinstance(op.col2, str) else op.col2
+    col1 = df[_resolve_col(op.col1, colmap)].to_numpy()
+    col2 = df[_resolve_col(op.col2, colmap)].to_numpy() if isinstance(op.col2, str) else op.col2
     
-    if op.op == "+": df[op.new_col] = col1 + col2
-    elif op.op == "-": df[op.new_col] = col1 - col2
-    elif op.op == "*": df[op.new_col] = col1 * col2
-    elif op.op == "/": df[op.new_col] = col1 / col2
+    if op.op == "+": new_values = col1 + col2
+    elif op.op == "-": new_values = col1 - col2
+    elif op.op == "*": new_values = col1 * col2
+    elif op.op == "/": new_values = col1 / col2
     else: raise ValueError(f"Unsupported compute operation: {op.op}")
-        
-    return df, {}
+    
+    # assign() returns a new frame instead of mutating the caller's DataFrame.
+    return df.assign(**{op.new_col: new_values}), {}
 
 def _do_pivot(df: pd.DataFrame, colmap: Dict[str, str], op: PivotOp) -> (pd.DataFrame, Dict[str, Any]):
     index = _resolve_col(op.index, colmap)
@@ -280,6 +395,9 @@ _ACTIONS = {
     "melt": _do_melt,
 }
 
+# Actions that never add, drop, or rename columns, so the colmap stays valid.
+_COLUMN_PRESERVING_ACTIONS = {"filter", "sort", "head", "tail", "dropna", "fillna"}
+
 def pandas_tool(tool_input: PandasToolInput) -> Dict[str, Any]:
     """
     A sandboxed pandas DataFrame processor for CSV data.
@@ -291,38 +409,76 @@ def pandas_tool(tool_input: PandasToolInput) -> Dict[str, Any]:
     or a scalar result if an aggregation produces one.
     """
     try:
+        
+        source_hash = _source_sha1(DATA_ROOT, tool_input.data_path, tool_input.csv_text)
+        # The path is part of the key: identical bytes under another name must report that name in meta_in.
+        cache_key = (
+            source_hash,
+            _resolve_data_path(DATA_ROOT, tool_input.data_path) if tool_input.data_path else None,
+            tool_input.model_dump_json(include={"operations", "max_output_rows", "output_format"})
+        )
+        cached = _RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            # Callers append to and mutate results, so each gets its own top-level dict.
+            return dict(cached)
        
-        df, meta_in = _read_csv(DATA_ROOT, tool_input.data_path, tool_input.csv_text)
+        df, meta_in = _read_csv(DATA_ROOT, tool_input.data_path, tool_input.csv_text, source_hash)
         
         df = _normalize_numeric_columns(df)
         
         colmap = _build_colmap(df)
+        colmap_columns = tuple(df.columns)
         
         operation_log = []
         result_data = df
         
-        for op in tool_input.operations:
+        operations = tool_input.operations
+        fused_index = None
+        
+        # Handlers return new frames instead of mutating their input, so no copies are needed here.
+        for i, op in enumerate(operations):
+            if i == fused_index:
+                # Already applied as part of the preceding sort.
+                operation_log.append({
+                    "action": op.action,
+                    "params": op.model_dump(),
+                    "meta": {"fused_into": "sort"}
+                })
+                continue
+        
             handler = _ACTIONS.get(op.action)
             if not handler:
                 raise ValueError(f"Unknown operation action: {op.action}")
-             
-            result_data, op_meta = handler(result_data, colmap, op)
-            
+        
+            next_op = operations[i + 1] if i + 1 < len(operations) else None
+            if op.action == "sort" and next_op is not None and next_op.action == "head":
+                result_data, op_meta = _do_sort_head(result_data, colmap, op, next_op)
+                fused_index = i + 1
+            else:
+                result_data, op_meta = handler(result_data, colmap, op)
+        
             operation_log.append({
                 "action": op.action,
                 "params": op.model_dump(),
                 "meta": op_meta
             })
-            
+        
             if not isinstance(result_data, pd.DataFrame):
-               
+           
                 meta_final = {
                     "meta_in": meta_in, 
                     "operations": operation_log
                 }
-                return {"result": result_data, "meta": meta_final}
-            
-            colmap = _build_colmap(result_data)
+                result = {"result": result_data, "meta": meta_final}
+                _RESULT_CACHE[cache_key] = result
+                return dict(result)
+        
+            if op.action in _COLUMN_PRESERVING_ACTIONS:
+                continue
+            current_columns = tuple(result_data.columns)
+            if current_columns != colmap_columns:
+                colmap = _build_colmap(result_data)
+                colmap_columns = current_columns
 
         df_result = result_data
         total_rows = len(df_result)
@@ -330,8 +486,13 @@ def pandas_tool(tool_input: PandasToolInput) -> Dict[str, Any]:
         if total_rows > tool_input.max_output_rows:
             df_result = df_result.head(tool_input.max_output_rows)
             
-        result_csv = df_result.to_csv(index=False)
-        preview_head = df_result.head(5).to_csv(index=False)
+        if tool_input.output_format == "arrow":
+            result_payload = {"result_arrow_b64": frame_to_arrow_b64(df_result.reset_index(drop=True))}
+            preview_head = df_result.head(5).to_csv(index=False)
+        else:
+            result_csv = df_result.to_csv(index=False)
+            result_payload = {"result_csv": result_csv}
+            preview_head = _csv_preview(result_csv, 5)
         
         meta_out = {
             "final_rows_total": total_rows,
@@ -341,14 +502,16 @@ def pandas_tool(tool_input: PandasToolInput) -> Dict[str, Any]:
             "preview_head": preview_head
         }
         
-        return {
-            "result_csv": result_csv,
+        result = {
+            **result_payload,
             "meta": {
                 "meta_in": meta_in,
                 "meta_out": meta_out,
                 "operations": operation_log
             }
         }
+        _RESULT_CACHE[cache_key] = result
+        return dict(result)
 
     except Exception as e:
        
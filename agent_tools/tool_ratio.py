@@ -1,41 +1,95 @@
-from typing import Dict, Any, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Any, Callable, NamedTuple
+from pydantic import BaseModel, Field, model_validator
+
+
+# Accepted keys for RatioInput.values.
+RATIO_FIELDS: Dict[str, str] = {
+    # --- Income Statement Inputs ---
+    "revenue": "Total Revenue",
+    "cost_of_goods_sold": "Cost of Goods Sold (COGS)",
+    "operating_income": "Operating Income (EBIT)",
+    "net_income": "Net Income",
+    # --- Balance Sheet Inputs ---
+    "total_assets": "Total Assets",
+    "total_equity": "Total Equity",
+    "current_assets": "Current Assets",
+    "current_liabilities": "Current Liabilities",
+    "inventory": "Inventory",
+    "total_debt": "Total Debt",
+    "long_term_debt": "Long Term Debt",
+    # --- Valuation/Share Inputs ---
+    "price_per_share": "Share Price",
+    "earnings_per_share": "EPS",
+    "book_value_per_share": "Book Value per Share",
+    "weighted_average_shares": "Weighted Average Shares",
+    "preferred_dividends": "Preferred Dividends",
+    # --- Cash Flow/Other ---
+    "free_cash_flow": "Free Cash Flow",
+    "interest_expense": "Interest Expense",
+}
 
 
 class RatioInput(BaseModel):
     """
     Input arguments for calculating financial ratios.
-    Provide the 'ratio_name' and the necessary numeric values for that ratio.
+    Provide the 'ratio_name' and, under 'values', the numbers that ratio needs.
     """
     ratio_name: str = Field(
         description="The name of the ratio (e.g. 'gross_margin', 'roe', 'current_ratio')."
     )
-    
-    
-    revenue: Optional[float] = Field(default=None, description="Total Revenue")
-    cost_of_goods_sold: Optional[float] = Field(default=None, description="Cost of Goods Sold (COGS)")
-    operating_income: Optional[float] = Field(default=None, description="Operating Income (EBIT)")
-    net_income: Optional[float] = Field(default=None, description="Net Income")
-    
-    # --- Balance Sheet Inputs ---
-    total_assets: Optional[float] = Field(default=None, description="Total Assets")
-    total_equity: Optional[float] = Field(default=None, description="Total Equity")
-    current_assets: Optional[float] = Field(default=None, description="Current Assets")
-    current_liabilities: Optional[float] = Field(default=None, description="Current Liabilities")
-    inventory: Optional[float] = Field(default=None, description="Inventory")
-    total_debt: Optional[float] = Field(default=None, description="Total Debt")
-    long_term_debt: Optional[float] = Field(default=None, description="Long Term Debt")
-    
-    # --- Valuation/Share Inputs ---
-    price_per_share: Optional[float] = Field(default=None, description="Share Price")
-    earnings_per_share: Optional[float] = Field(default=None, description="EPS")
-    book_value_per_share: Optional[float] = Field(default=None, description="Book Value per Share")
-    weighted_average_shares: Optional[float] = Field(default=None, description="Weighted Average Shares")
-    preferred_dividends: Optional[float] = Field(default=None, description="Preferred Dividends")
-    
-    # --- Cash Flow/Other ---
-    free_cash_flow: Optional[float] = Field(default=None, description="Free Cash Flow")
-    interest_expense: Optional[float] = Field(default=None, description="Interest Expense")
+    values: Dict[str, float] = Field(
+        default_factory=dict,
+        description=f"Numeric inputs keyed by field name: {', '.join(RATIO_FIELDS)}."
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _fold_flat_values(cls, data: Any) -> Any:
+        # Older plans pass the inputs as top-level keys; fold them into 'values'.
+        if isinstance(data, dict) and any(k in RATIO_FIELDS for k in data):
+            data = dict(data)
+            values = dict(data.get("values") or {})
+            for k in RATIO_FIELDS:
+                if k in data:
+                    v = data.pop(k)
+                    if v is not None: values[k] = v
+            data["values"] = values
+        return data
+
+
+class _RatioSpec(NamedTuple):
+    denominator: str
+    label: str
+    fn: Callable[[Callable[[str], float]], float]
+
+
+# Each ratio declares the field it divides by (checked for zero up front) and its formula.
+RATIOS: Dict[str, _RatioSpec] = {
+    # --- Profitability ---
+    "gross_margin": _RatioSpec("revenue", "Revenue", lambda get: (get("revenue") - get("cost_of_goods_sold")) / get("revenue")),
+    "operating_margin": _RatioSpec("revenue", "Revenue", lambda get: get("operating_income") / get("revenue")),
+    "net_margin": _RatioSpec("revenue", "Revenue", lambda get: get("net_income") / get("revenue")),
+    "return_on_assets": _RatioSpec("total_assets", "Total Assets", lambda get: get("net_income") / get("total_assets")),
+    "return_on_equity": _RatioSpec("total_equity", "Total Equity", lambda get: get("net_income") / get("total_equity")),
+    # --- Liquidity ---
+    "current_ratio": _RatioSpec("current_liabilities", "Current Liabilities", lambda get: get("current_assets") / get("current_liabilities")),
+    "quick_ratio": _RatioSpec("current_liabilities", "Current Liabilities", lambda get: (get("current_assets") - get("inventory")) / get("current_liabilities")),
+    "debt_to_equity": _RatioSpec("total_equity", "Total Equity", lambda get: get("total_debt") / get("total_equity")),
+    "interest_coverage": _RatioSpec("interest_expense", "Interest Expense", lambda get: get("operating_income") / get("interest_expense")),
+    "asset_turnover": _RatioSpec("total_assets", "Total Assets", lambda get: get("revenue") / get("total_assets")),
+    "inventory_turnover": _RatioSpec("inventory", "Inventory", lambda get: get("cost_of_goods_sold") / get("inventory")),
+    # --- Valuation ---
+    "earnings_per_share": _RatioSpec("weighted_average_shares", "Shares", lambda get: (get("net_income") - get("preferred_dividends")) / get("weighted_average_shares")),
+    "price_to_earnings": _RatioSpec("earnings_per_share", "EPS", lambda get: get("price_per_share") / get("earnings_per_share")),
+    "price_to_book": _RatioSpec("book_value_per_share", "Book Value", lambda get: get("price_per_share") / get("book_value_per_share")),
+}
+
+RATIO_ALIASES: Dict[str, str] = {
+    "roa": "return_on_assets", "roe": "return_on_equity", "eps": "earnings_per_share",
+    "pe": "price_to_earnings", "pb": "price_to_book",
+}
+
+_NAME_TRANS = str.maketrans({" ": "_", "-": "_"})
 
 
 def ratio_calculator(tool_input: RatioInput) -> Dict[str, Any]:
@@ -43,111 +97,26 @@ def ratio_calculator(tool_input: RatioInput) -> Dict[str, Any]:
     Calculates the requested financial ratio based on the provided inputs.
     """
     try:
-        name = tool_input.ratio_name.lower().replace(" ", "_").replace("-", "_")
-        result = None
-        
-        def get(field): return getattr(tool_input, field) or 0.0
-
-        # --- Profitability ---
-        if name == "gross_margin":
-            # (Revenue - COGS) / Revenue
-            rev = get("revenue")
-            if rev == 0: raise ValueError("Revenue cannot be zero")
-            result = (rev - get("cost_of_goods_sold")) / rev
-
-        elif name == "operating_margin":
-            # Op Income / Revenue
-            rev = get("revenue")
-            if rev == 0: raise ValueError("Revenue cannot be zero")
-            result = get("operating_income") / rev
-
-        elif name == "net_margin":
-            # Net Income / Revenue
-            rev = get("revenue")
-            if rev == 0: raise ValueError("Revenue cannot be zero")
-            result = get("net_income") / rev
-
-        elif name == "return_on_assets" or name == "roa":
-            # Net Income / Total Assets
-            assets = get("total_assets")
-            if assets == 0: raise ValueError("Total Assets cannot be zero")
-            result = get("net_income") / assets
-
-        elif name == "return_on_equity" or name == "roe":
-            # Net Income / Total Equity
-            equity = get("total_equity")
-            if equity == 0: raise ValueError("Total Equity cannot be zero")
-            result = get("net_income") / equity
-
-        # --- Liquidity ---
-        elif name == "current_ratio":
-            # Current Assets / Current Liabilities
-            liab = get("current_liabilities")
-            if liab == 0: raise ValueError("Current Liabilities cannot be zero")
-            result = get("current_assets") / liab
-
-        elif name == "quick_ratio":
-            # (Current Assets - Inventory) / Current Liabilities
-            liab = get("current_liabilities")
-            if liab == 0: raise ValueError("Current Liabilities cannot be zero")
-            result = (get("current_assets") - get("inventory")) / liab
-
-        elif name == "debt_to_equity":
-            # Total Debt / Total Equity
-            equity = get("total_equity")
-            if equity == 0: raise ValueError("Total Equity cannot be zero")
-            result = get("total_debt") / equity
-
-        elif name == "interest_coverage":
-            # Operating Income / Interest Expense
-            interest = get("interest_expense")
-            if interest == 0: raise ValueError("Interest Expense cannot be zero")
-            result = get("operating_income") / interest
-
-        
-        elif name == "asset_turnover":
-            # Revenue / Total Assets
-            assets = get("total_assets")
-            if assets == 0: raise ValueError("Total Assets cannot be zero")
-            result = get("revenue") / assets
-
-        elif name == "inventory_turnover":
-            # COGS / Inventory
-            inv = get("inventory")
-            if inv == 0: raise ValueError("Inventory cannot be zero")
-            result = get("cost_of_goods_sold") / inv
-
-        # --- Valuation ---
-        elif name == "earnings_per_share" or name == "eps":
-            # (Net Income - Pref Div) / Shares
-            shares = get("weighted_average_shares")
-            if shares == 0: raise ValueError("Shares cannot be zero")
-            result = (get("net_income") - get("preferred_dividends")) / shares
-
-        elif name == "price_to_earnings" or name == "pe":
-            # Price / EPS
-            eps = get("earnings_per_share")
-            if eps == 0: raise ValueError("EPS cannot be zero")
-            result = get("price_per_share") / eps
-
-        elif name == "price_to_book" or name == "pb":
-            # Price / Book Value
-            bv = get("book_value_per_share")
-            if bv == 0: raise ValueError("Book Value cannot be zero")
-            result = get("price_per_share") / bv
-
-        else:
+        name = tool_input.ratio_name.lower().translate(_NAME_TRANS)
+        spec = RATIOS.get(name) or RATIOS.get(RATIO_ALIASES.get(name, ""))
+        if spec is None:
             return {"error": f"Unknown ratio: {name}"}
 
-       
+        vals = tool_input.values
+        # Omitted inputs count as 0, as with the old optional fields (e.g. quick_ratio without inventory).
+        def get(field): return vals.get(field) or 0.0
+
+        if get(spec.denominator) == 0: raise ValueError(f"{spec.label} cannot be zero")
+        result = spec.fn(get)
+
         return {
             "result": round(float(result), 4),
             "ratio_name": name,
-            "inputs": tool_input.model_dump(exclude_none=True)
+            "inputs": dict(tool_input.values)
         }
 
     except Exception as e:
         return {
             "error": f"Calculation failed: {str(e)}",
             "ratio_name": tool_input.ratio_name
-        }
\ No newline at end of file
+        }
@@ -1,13 +1,12 @@
-from pydantic import BaseModel, Field, model_validator, RootModel
-from typing import List, Dict, Any, Optional, Callable, Union, Literal
-
-def _df(rate: float, t: float, mid_year: bool) -> float:
-    shift = 0.5 if mid_year else 0.0
-    return (1.0 + rate) ** -(t - shift)
+import math
+import numpy as np
+from functools import lru_cache
+from pydantic import BaseModel, Field, model_validator, RootModel, ValidationError
+from typing import List, Dict, Any, Optional, Callable, Union, Literal, Tuple, Annotated
 
 def _npv_from_series(cash_flows: List[float], rate: float, mid_year: bool = False, include_t0: bool = False) -> float:
     if rate <= -1.0: raise ValueError("discount_rate must be > -100%")
-    if not cash_flows: return 0.0
+    if len(cash_flows) == 0: return 0.0
     total = 0.0
     if include_t0:
         total += cash_flows[0]
@@ -16,23 +15,41 @@ def _npv_from_series(cash_flows: List[float], rate: float, mid_year: bool = Fals
     else:
         flows = cash_flows
         start_t = 1
-    for i, cf in enumerate(flows, start=start_t):
-        total += cf * _df(rate, i, mid_year)
-    return total
+    flows = _as_flows(flows)
+    if flows.size and np.all(flows == flows[0]):
+        # Level annuity: closed-form geometric sum instead of a discount vector
+        n = flows.size
+        if rate == 0.0: return total + float(flows[0]) * n
+        # expm1/log1p keep (1 - (1+r)^-n) / r accurate when r is tiny
+        factor = -math.expm1(-n * math.log1p(rate)) / rate
+        if mid_year: factor *= (1.0 + rate) ** 0.5
+        return total + float(flows[0]) * factor
+    return total + _pv_series(flows, rate, mid_year, start_t)
+
+def _as_flows(cash_flows: List[float]) -> np.ndarray:
+    return np.ascontiguousarray(cash_flows, dtype=np.float64)
+
+def _discount_factors(rate: float, n: int, mid_year: bool, start_t: int = 1) -> np.ndarray:
+    t = np.arange(start_t, start_t + n, dtype=np.float64)
+    if mid_year: t -= 0.5
+    return np.power(1.0 + rate, -t)
+
+def _pv_series(flows: List[float], rate: float, mid_year: bool, start_t: int = 1) -> float:
+    arr = _as_flows(flows)
+    return float(arr @ _discount_factors(rate, arr.size, mid_year, start_t))
 
 def _irr_bisection(cash_flows: List[float], tol: float = 1e-7, max_iter: int = 200) -> float:
+    cf = _as_flows(cash_flows)
+    t = np.arange(cf.size, dtype=np.float64)
     def npv_at(r: float) -> float:
-        if not cash_flows: return 0.0
-        total = cash_flows[0]
-        for t, cf in enumerate(cash_flows[1:], start=1):
-            total += cf / (1.0 + r) ** t
-        return total
+        return float(cf @ np.power(1.0 + r, -t))
     low, high = -0.9999, 10.0
     f_low, f_high = npv_at(low), npv_at(high)
     if f_low == 0.0: return low
     if f_high == 0.0: return high
     if f_low * f_high > 0: raise ValueError("IRR not bracketed (cash flows may not have a sign change).")
     for _ in range(max_iter):
+        if high - low < 2 * tol: break
         mid = (low + high) / 2.0
         f_mid = npv_at(mid)
         if abs(f_mid) < tol: return mid
@@ -40,12 +57,34 @@ def _irr_bisection(cash_flows: List[float], tol: float = 1e-7, max_iter: int = 2
         else: low, f_low = mid, f_mid
     return (low + high) / 2.0
 
+def _irr_newton(cash_flows: List[float], tol: float = 1e-7, max_iter: int = 50) -> float:
+    cf = _as_flows(cash_flows)
+    t = np.arange(cf.size, dtype=np.float64)
+    low, high = -0.9999, 10.0
+    f_low, f_high = float(cf @ np.power(1.0 + low, -t)), float(cf @ np.power(1.0 + high, -t))
+    if f_low == 0.0: return low
+    if f_high == 0.0: return high
+    if f_low * f_high > 0: raise ValueError("IRR not bracketed (cash flows may not have a sign change).")
+    # Loop-invariant weights for the derivative: d/dr sum(cf_t (1+r)^-t) = -sum(t cf_t (1+r)^-t) / (1+r)
+    tcf = t * cf
+    r = 0.1
+    for _ in range(max_iter):
+        d = np.power(1.0 + r, -t)
+        f = float(cf @ d)
+        fp = -float(tcf @ d) / (1.0 + r)
+        if fp == 0.0 or not np.isfinite(fp): break
+        step = f / fp
+        r -= step
+        if not np.isfinite(r) or r <= -1.0 or r > high: break
+        if abs(step) < tol: return float(r)
+    return _irr_bisection(cash_flows, tol)
+
 #  Core Operations 
 def npv(cash_flows: List[float], discount_rate: float, *, mid_year: bool = False, include_t0: bool = False) -> float:
-    return float(_npv_from_series(cash_flows, discount_rate, mid_year, include_t0))
+    return float(_npv_from_series(_as_flows(cash_flows), discount_rate, mid_year, include_t0))
 
 def irr(cash_flows: List[float]) -> float:
-    return float(_irr_bisection(cash_flows))
+    return float(_irr_newton(_as_flows(cash_flows)))
 
 def terminal_value_gordon(fcf_next_year: float, rate: float, g: float) -> float:
     if rate <= g: raise ValueError("rate must be greater than g for Gordon Growth.")
@@ -64,12 +103,20 @@ def wacc(cost_of_equity: float, cost_of_debt_pre_tax: float, tax_rate: float, eq
 def cost_of_equity_capm(risk_free: float, beta: float, market_premium: float) -> float:
     return float(risk_free + beta * market_premium)
 
-def dcf_fcff(fcff: List[float], wacc_rate: float, *, terminal: Dict[str, Any], mid_year: bool = True, net_debt: float = 0.0, minority_interest: float = 0.0, cash_and_investments: float = 0.0, shares_outstanding: Optional[float] = None) -> Dict[str, Any]:
+def _copy_result(out: Dict[str, Any]) -> Dict[str, Any]:
+    # Cached DCF results are shared; hand callers their own (nested) dicts.
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in out.items()}
+
+def _terminal_key(terminal: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(sorted(terminal.items()))
+
+@lru_cache(maxsize=256)
+def _dcf_fcff_cached(fcff: Tuple[float, ...], wacc_rate: float, terminal_key: Tuple[Tuple[str, Any], ...], mid_year: bool, net_debt: float, minority_interest: float, cash_and_investments: float, shares_outstanding: Optional[float]) -> Dict[str, Any]:
+    terminal = dict(terminal_key)
     if not fcff: raise ValueError("fcff must contain at least one period.")
     if wacc_rate <= -1.0: raise ValueError("wacc_rate must be > -100%")
-    pv_projection = 0.0
-    for t, cf in enumerate(fcff, start=1):
-        pv_projection += cf * _df(wacc_rate, t, mid_year)
+    disc = _discount_factors(wacc_rate, len(fcff), mid_year)
+    pv_projection = float(_as_flows(fcff) @ disc)
     if terminal.get("method") == "gordon":
         g = float(terminal["g"])
         fcf_next = fcff[-1] * (1.0 + g)
@@ -79,8 +126,8 @@ def dcf_fcff(fcff: List[float], wacc_rate: float, *, terminal: Dict[str, Any], m
         metric = float(terminal["metric"])
         tv = terminal_value_exit_multiple(metric, multiple)
     else: raise ValueError("terminal.method must be 'gordon' or 'exit_multiple'")
-    N = len(fcff)
-    pv_terminal = tv * _df(wacc_rate, N, mid_year)
+    # Terminal value is discounted with the same factor as the final projection year.
+    pv_terminal = tv * float(disc[-1])
     enterprise_value = pv_projection + pv_terminal
     equity_value = enterprise_value - float(net_debt) - float(minority_interest) + float(cash_and_investments)
     out: Dict[str, Any] = {
@@ -101,12 +148,16 @@ def dcf_fcff(fcff: List[float], wacc_rate: float, *, terminal: Dict[str, Any], m
         out["equity_value_per_share"] = float(equity_value / shares_outstanding)
     return out
 
-def dcf_fcfe(fcfe: List[float], cost_of_equity: float, *, terminal: Dict[str, Any], mid_year: bool = True, shares_outstanding: Optional[float] = None) -> Dict[str, Any]:
+def dcf_fcff(fcff: List[float], wacc_rate: float, *, terminal: Dict[str, Any], mid_year: bool = True, net_debt: float = 0.0, minority_interest: float = 0.0, cash_and_investments: float = 0.0, shares_outstanding: Optional[float] = None) -> Dict[str, Any]:
+    return _copy_result(_dcf_fcff_cached(tuple(fcff), wacc_rate, _terminal_key(terminal), mid_year, net_debt, minority_interest, cash_and_investments, shares_outstanding))
+
+@lru_cache(maxsize=256)
+def _dcf_fcfe_cached(fcfe: Tuple[float, ...], cost_of_equity: float, terminal_key: Tuple[Tuple[str, Any], ...], mid_year: bool, shares_outstanding: Optional[float]) -> Dict[str, Any]:
+    terminal = dict(terminal_key)
     if not fcfe: raise ValueError("fcfe must contain at least one period.")
     if cost_of_equity <= -1.0: raise ValueError("cost_of_equity must be > -100%")
-    pv_projection = 0.0
-    for t, cf in enumerate(fcfe, start=1):
-        pv_projection += cf * _df(cost_of_equity, t, mid_year)
+    disc = _discount_factors(cost_of_equity, len(fcfe), mid_year)
+    pv_projection = float(_as_flows(fcfe) @ disc)
     if terminal.get("method") == "gordon":
         g = float(terminal["g"])
         fcf_next = fcfe[-1] * (1.0 + g)
@@ -116,8 +167,8 @@ def dcf_fcfe(fcfe: List[float], cost_of_equity: float, *, terminal: Dict[str, An
         metric = float(terminal["metric"])
         tv = terminal_value_exit_multiple(metric, multiple)
     else: raise ValueError("terminal.method must be 'gordon' or 'exit_multiple'")
-    N = len(fcfe)
-    pv_terminal = tv * _df(cost_of_equity, N, mid_year)
+    # Terminal value is discounted with the same factor as the final projection year.
+    pv_terminal = tv * float(disc[-1])
     equity_value = pv_projection + pv_terminal
     out: Dict[str, Any] = {
         "equity_value": float(equity_value), "pv_projection": float(pv_projection),
@@ -134,6 +185,9 @@ def dcf_fcfe(fcfe: List[float], cost_of_equity: float, *, terminal: Dict[str, An
         out["equity_value_per_share"] = float(equity_value / shares_outstanding)
     return out
 
+def dcf_fcfe(fcfe: List[float], cost_of_equity: float, *, terminal: Dict[str, Any], mid_year: bool = True, shares_outstanding: Optional[float] = None) -> Dict[str, Any]:
+    return _copy_result(_dcf_fcfe_cached(tuple(fcfe), cost_of_equity, _terminal_key(terminal), mid_year, shares_outstanding))
+
 _VALUATION_OPS = {
     "npv": npv, "irr": irr, "terminal_value_gordon": terminal_value_gordon,
     "terminal_value_exit_multiple": terminal_value_exit_multiple, "dcf_fcff": dcf_fcff,
@@ -212,29 +266,53 @@ class DCFFCFEInputs(BaseModel):
     shares_outstanding: Optional[float] = None
 
 
-class AnyValuationInput(RootModel):
-    root: Union[
+AnyValuationUnion = Annotated[
+    Union[
         NPVInputs, IRRInputs, TVGordonInputs, TVExitMultipleInputs,
         WACCInputs, CAPMInputs, DCFFCFFInputs, DCFFCFEInputs
-    ]
+    ],
+    Field(discriminator="operation"),
+]
+
+class AnyValuationInput(RootModel):
+    root: AnyValuationUnion
 
 
-def valuation_tool(tool_input: AnyValuationInput) -> Dict[str, Any]: 
+def _args(model: BaseModel) -> Dict[str, Any]:
+    return {k: getattr(model, k) for k in type(model).model_fields if k != "operation"}
+
+
+_OP_TO_MODEL: Dict[str, type[BaseModel]] = {
+    "npv": NPVInputs, "irr": IRRInputs, "terminal_value_gordon": TVGordonInputs,
+    "terminal_value_exit_multiple": TVExitMultipleInputs, "wacc": WACCInputs,
+    "cost_of_equity_capm": CAPMInputs, "dcf_fcff": DCFFCFFInputs, "dcf_fcfe": DCFFCFEInputs,
+}
+
+
+def valuation_tool(tool_input: Union[AnyValuationInput, Dict[str, Any]]) -> Dict[str, Any]: 
   
     """
     Perform a specific valuation calculation.
     Input must be a JSON object matching the schema for the specific operation.
+    A raw dict is validated against the model for its 'operation' only.
     """
+    operation = "unknown"
     try:
-       
-        actual_input = tool_input.root 
+        if isinstance(tool_input, dict):
+            operation = tool_input.get("operation", "unknown")
+            model_cls = _OP_TO_MODEL.get(operation)
+            if model_cls is None:
+                return {"error": f"Unsupported operation: {operation}"}
+            actual_input = model_cls.model_validate(tool_input)
+        else:
+            actual_input = tool_input.root 
         
         operation = actual_input.operation
         fn_to_call = _VALUATION_OPS.get(operation)
         if fn_to_call is None:
             return {"error": f"Unsupported operation: {operation}"}
         
-        input_args = actual_input.model_dump(exclude={"operation"})
+        input_args = _args(actual_input)
         
         if operation in ("dcf_fcff", "dcf_fcfe"):
             input_args['terminal'] = actual_input.terminal.model_dump()
@@ -250,8 +328,13 @@ def valuation_tool(tool_input: AnyValuationInput) -> Dict[str, Any]:
             "inputs": input_args
         }
 
+    except ValidationError as e:
+        # Raw dict input: report the field errors the way tool_executor does.
+        errors = e.errors(include_url=False, include_context=False)
+        summary = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in errors)
+        return {"error": f"Validation Error: {summary}", "errors": errors, "operation": operation, "status": "validation_error"}
     except (ValueError, TypeError) as e:
         
-        return {"error": str(e), "operation": getattr(tool_input.root, 'operation', 'unknown')}
+        return {"error": str(e), "operation": operation}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
\ No newline at end of file
@@ -1,21 +1,47 @@
 import streamlit as st
 import os
+import shutil
 import tempfile
 from typing import List, Tuple
 
 from state import AgentState
-from graph import app as agent_app  # Importing the compiled graph
 from ingest_user_file import ingest_user_file, IngestInput
 
+
+@st.cache_resource
+def _get_agent():
+    # Compile the graph once per server process, not on every Streamlit rerun.
+    from graph import app
+    return app
+
+
 st.set_page_config(page_title="Financial Agent", layout="wide")
 st.title("🤖 AI Financial Analyst Agent")
 
+agent_app = _get_agent()
+
 # We need to store the chat history and the file info so they persist 
 # when Streamlit re-runs the script.
 
 if "messages" not in st.session_state:
     st.session_state.messages = []  # Store UI chat history
 
+if "chat_history_tuples" not in st.session_state:
+    st.session_state.chat_history_tuples = []  # (role, content) pairs fed to the agent, kept in sync with messages
+
+if "agent_state" not in st.session_state:
+    # One state dict per session; per-turn fields are reset in place before each run
+    st.session_state.agent_state = AgentState(
+        query="",
+        chat_history=st.session_state.chat_history_tuples,
+        user_file_info=None,
+        retrieved_chunks=[],
+        tool_calls=[],
+        tool_outputs=[],
+        clarification_question=None,
+        final_answer=None
+    )
+
 if "user_file_info" not in st.session_state:
     st.session_state.user_file_info = None # Store uploaded file metadata
 
@@ -30,26 +56,33 @@ with st.sidebar:
         with st.spinner("Ingesting file... (Vectors + Pinecone)"):
             
             # Save to a temporary file because your ingest function expects a path
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp:
-                tmp.write(uploaded_file.getvalue())
+            # Copy in 1 MiB chunks rather than materializing a second full copy via getvalue()
+            suffix = os.path.splitext(uploaded_file.name)[1]
+            uploaded_file.seek(0)
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+                shutil.copyfileobj(uploaded_file, tmp, length=1 << 20)
                 tmp_path = tmp.name
 
-            #  CALL YOUR BACKEND INGESTION 
-            ingest_input = IngestInput(
-                file_path=tmp_path,
-                file_name=uploaded_file.name
-            )
-            result = ingest_user_file(ingest_input)
-            
-            # Store the result (Namespace ID) in session state
-            if result.get("user_file_info"):
-                st.session_state.user_file_info = result["user_file_info"]
-                st.success(f"Loaded: {uploaded_file.name}")
-            else:
-                st.error("Ingestion failed.")
-            
-            # Cleanup temp file
-            os.remove(tmp_path)
+            try:
+                #  CALL YOUR BACKEND INGESTION 
+                ingest_input = IngestInput(
+                    file_path=tmp_path,
+                    file_name=uploaded_file.name
+                )
+                result = ingest_user_file(ingest_input)
+                
+                # Store the result (Namespace ID) in session state
+                if result.get("user_file_info"):
+                    st.session_state.user_file_info = result["user_file_info"]
+                    st.success(f"Loaded: {uploaded_file.name}")
+                else:
+                    st.error("Ingestion failed.")
+            finally:
+                # Cleanup temp file, even if ingestion raised
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
 
     # Show current status
     if st.session_state.user_file_info:
@@ -70,21 +103,20 @@ if prompt := st.chat_input("Ask about financial data..."):
     
     # 1. Add user message to UI
     st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.chat_history_tuples.append(("user", prompt))
     with st.chat_message("user"):
         st.markdown(prompt)
 
     # 2. Prepare the Agent State
-    # We reconstruct the state with the current query and history
-    initial_state = AgentState(
-        query=prompt,
-        chat_history=[(m["role"], m["content"]) for m in st.session_state.messages],
-        user_file_info=st.session_state.user_file_info, # Pass the file ID!
-        retrieved_chunks=[],
-        tool_calls=[],
-        tool_outputs=[],
-        clarification_question=None,
-        final_answer=None
-    )
+    # Reuse the session's state dict: set the new query and reset the per-turn fields
+    initial_state = st.session_state.agent_state
+    initial_state["query"] = prompt
+    initial_state["user_file_info"] = st.session_state.user_file_info # Pass the file ID!
+    initial_state["retrieved_chunks"].clear()
+    initial_state["tool_calls"].clear()
+    initial_state["tool_outputs"].clear()
+    initial_state["clarification_question"] = None
+    initial_state["final_answer"] = None
 
     # 3. Run the Agent (Stream the steps)
     with st.chat_message("assistant"):
@@ -97,7 +129,7 @@ if prompt := st.chat_input("Ask about financial data..."):
             # recursion_limit protects against infinite loops
             for step in agent_app.stream(initial_state, {"recursion_limit": 20}):
                 
-                step_name = list(step.keys())[0]
+                step_name = next(iter(step))
                 step_state = step[step_name]
                 
                 if step_name == "router":
@@ -123,4 +155,5 @@ if prompt := st.chat_input("Ask about financial data..."):
         message_placeholder.markdown(full_response)
         
         # 5. Save assistant response to history
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+        st.session_state.chat_history_tuples.append(("assistant", full_response))
\ No newline at end of file
@@ -1,19 +1,25 @@
-import json
 import os
+import orjson
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
-load_dotenv()
-
 from state import AgentState 
 
 
-_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite", 
-    temperature=0,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+@lru_cache(maxsize=1)
+def _get_llm():
+    # Imported lazily so `import ask` doesn't pull in LangChain / the Google SDK.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from dotenv import load_dotenv
+    load_dotenv()
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite", 
+        temperature=0,
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+# Tool outputs can carry NumPy scalars (valuation kernels) and non-string keys (groupby results).
+_ORJSON_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
 
 SYSTEM_PROMPT = """
 You are the "Clarifier" for a financial analysis agent.
@@ -49,19 +55,26 @@ def _format_state_for_clarification(state: AgentState) -> str:
     
     chunks_str = "Retrieved Context: None\n" # Default
     if chunks := state.get("retrieved_chunks"):
-        chunks_str = "--- Retrieved Context ---\n"
+        parts = ["--- Retrieved Context ---\n"]
         for i, chunk in enumerate(chunks, 1):
-            chunks_str += f"[Chunk {i}] (Source: {chunk.get('source', 'N/A')})\n"
-            chunks_str += f"  Text: {chunk.get('text', '')[:250]}...\n" 
-            chunks_str += "-------------------------\n"
+            preview = chunk.get('text', '')[:250]
+            parts.append(
+                f"[Chunk {i}] (Source: {chunk.get('source', 'N/A')})\n"
+                f"  Text: {preview}...\n"
+                "-------------------------\n"
+            )
+        chunks_str = "".join(parts)
             
     tools_str = "Calculation Results: None\n" # Default
     if outputs := state.get("tool_outputs"):
-        tools_str = "--- Calculation Results (Check for errors here) ---\n"
+        parts = ["--- Calculation Results (Check for errors here) ---\n"]
         for i, out in enumerate(outputs, 1):
-            tools_str += f"[Result {i}]\n"
-            tools_str += f"{json.dumps(out, indent=2)}\n"
-            tools_str += "-------------------------\n"
+            parts.append(
+                f"[Result {i}]\n"
+                f"{orjson.dumps(out, option=_ORJSON_OPTS).decode()}\n"
+                "-------------------------\n"
+            )
+        tools_str = "".join(parts)
 
     
     return (
@@ -97,7 +110,7 @@ def ask_user(state: AgentState) -> Dict[str, Any]:
     
     try:
         # 3. Call the LLM
-        ai_response = _llm.invoke(messages)
+        ai_response = _get_llm().invoke(messages)
         question = ai_response.content if hasattr(ai_response, 'content') else str(ai_response)
 
         
@@ -1,221 +1,266 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import csv
-import json
+import io
+import orjson
+import re
 import uuid
 from datetime import datetime, timezone
 import tiktoken
-from bs4 import BeautifulSoup
+from lxml import etree
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
+_XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+_ROW_CELLS = etree.XPath("./*[local-name()='cell']")
+# Header cells that look like a reporting period ("FY2023", "2022", "Q3 21", ...)
+_PERIOD_RE = re.compile(r"FY|\d")
+
+@lru_cache(maxsize=1)
 def get_tokenizer():
-    """Initializes and returns the tiktoken tokenizer."""
+    """Initializes and returns the tiktoken tokenizer (built once per process)."""
     return tiktoken.get_encoding("cl100k_base")
 
 def count_tokens(text, tokenizer):
     """Counts tokens in a text string."""
     return len(tokenizer.encode(text))
 
-def preprocess_and_cache_entities(soup, tokenizer, output_dir="structured_tables"):
-    """
-    Finds all entity definitions (tables, figures, footnotes), processes them
-    into chunk-ready dictionaries, and stores them in a cache.
-    (This version is robust against all known errors)
-    """
-    print("--- Starting Step A: Caching All Referenced Entities ---")
-    
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        
-    entity_cache = {}
+def _text(el) -> str:
+    """Concatenates the stripped text nodes under an element (same output as bs4's get_text(strip=True))."""
+    if len(el) == 0:
+        # Leaf element (cells, heads, titles): its only text node is el.text
+        return (el.text or "").strip()
+    return "".join(t.strip() for t in el.itertext())
 
-    # 1. Process Tables AND Figures in one go.
-    # We find ALL <figure> tags and then decide what to do.
-    
-    all_figures = soup.find_all('figure')
-    
-    for fig in all_figures:
-        
-        # First, check the 'type' attribute to see if it's a table.
-        fig_type = fig.get('type')
-        
-        if fig_type == 'table':
-            #  It's a TABLE, run table logic 
-            try:
-                table_id = fig.get('xml:id')
-                if not table_id:
-                    continue
-
-                head_tag = fig.find('head')
-                title = head_tag.get_text(strip=True) if head_tag else f"Table ({table_id})"
-                
-                desc_tag = fig.find('figDesc')
-                desc = desc_tag.get_text(strip=True) if desc_tag else ""
-                
-                table_tag = fig.find('table')
-                if not table_tag:
-                    continue
-                    
-                rows = []
-                for row in table_tag.find_all('row'):
-                    cells = [cell.get_text(strip=True) for cell in row.find_all('cell')]
-                    if cells:
-                        rows.append(cells)
-                
-                if not rows:
-                    print(f"    - Skipping table {table_id} (no rows found).")
-                    continue
-                    
-                csv_path = os.path.join(output_dir, f"{table_id}.csv")
-                with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                    csv.writer(f).writerows(rows)
-
-                header = rows[0]
-                data_rows = rows[1:]
-                
-                linearized_lines = []
-                if data_rows:
-                    for r in data_rows:
-                        if not r: continue
-                        row_key = r[0] if r else ""
-                        row_data = [f"{header[i]}: {r[i]}" for i in range(1, min(len(r), len(header))) if i < len(r)]
-                        linearized_lines.append(f"{row_key} -> " + ", ".join(row_data))
-                
-                linearized_text = "\n".join(linearized_lines)
-                chunk_text = f"Title: {title}\n\nDescription: {desc}\n\nData:\n{linearized_text}"
-                
-                entity_cache[table_id] = {
-                    "chunk_kind": "table_text",
-                    "heading_path": title,
-                    "chunk_text": chunk_text,
-                    "metadata_extras": {
-                        "table_title": title,
-                        "table_struct_path": csv_path,
-                        "units": "See document",
-                        "periods": [h for h in header if h and ("FY" in h or any(c.isdigit() for c in h))]
-                    }
+def _cache_figure(fig, entity_cache: Dict, output_dir: str) -> None:
+    """Turns one <figure> (a table or a plain figure) into a chunk-ready entity."""
+    # First, check the 'type' attribute to see if it's a table.
+    fig_type = fig.get('type')
+
+    if fig_type == 'table':
+        #  It's a TABLE, run table logic 
+        try:
+            table_id = fig.get(_XML_ID)
+            if not table_id:
+                return
+
+            head_tag = fig.find('.//{*}head')
+            title = _text(head_tag) if head_tag is not None else f"Table ({table_id})"
+
+            desc_tag = fig.find('.//{*}figDesc')
+            desc = _text(desc_tag) if desc_tag is not None else ""
+
+            table_tag = fig.find('.//{*}table')
+            if table_tag is None:
+                return
+
+            rows = []
+            for row in table_tag.iter('{*}row'):
+                cells = [_text(cell) for cell in _ROW_CELLS(row)]
+                if cells:
+                    rows.append(cells)
+
+            if not rows:
+                print(f"    - Skipping table {table_id} (no rows found).")
+                return
+
+            csv_path = os.path.join(output_dir, f"{table_id}.csv")
+            buf = io.StringIO(newline='')
+            csv.writer(buf).writerows(rows)
+            with open(csv_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+                f.write(buf.getvalue())
+
+            header = rows[0]
+            data_rows = rows[1:]
+
+            # "Header: " prefixes are built once per table, not once per cell
+            prefixes = [f"{h}: " for h in header]
+            hlen = len(header)
+            linearized_lines = []
+            for r in data_rows:
+                if not r: continue
+                row_data = [prefixes[i] + r[i] for i in range(1, min(len(r), hlen))]
+                linearized_lines.append(r[0] + " -> " + ", ".join(row_data))
+
+            linearized_text = "\n".join(linearized_lines)
+            chunk_text = f"Title: {title}\n\nDescription: {desc}\n\nData:\n{linearized_text}"
+
+            entity_cache[table_id] = {
+                "chunk_kind": "table_text",
+                "heading_path": title,
+                "chunk_text": chunk_text,
+                "metadata_extras": {
+                    "table_title": title,
+                    "table_struct_path": csv_path,
+                    "units": "See document",
+                    "periods": [h for h in header if h and _PERIOD_RE.search(h)]
                 }
-            except Exception as e:
-                print(f"    - WARNING: Skipping a table due to unexpected error: {e}")
-                continue
-        
-        else:
-            #  It's a FIGURE (or has no type), run figure logic 
-            try:
-                fig_id = fig.get('xml:id')
-                if not fig_id:
-                    continue
-                
-                caption_tag = fig.find('head')
-                caption = caption_tag.get_text(strip=True) if caption_tag else f"Figure ({fig_id})"
-                
-                desc_tag = fig.find('figDesc')
-                desc = desc_tag.get_text(strip=True) if desc_tag else ""
-                
-                chunk_text = f"Caption: {caption}\n\nDescription: {desc}".strip()
-                if chunk_text:
-                    entity_cache[fig_id] = {
-                        "chunk_kind": "caption",
-                        "heading_path": caption,
-                        "chunk_text": chunk_text
-                    }
-            except Exception as e:
-                print(f"    - WARNING: Skipping a figure due to unexpected error: {e}")
-                continue
+            }
+        except Exception as e:
+            print(f"    - WARNING: Skipping a table due to unexpected error: {e}")
+            return
 
-    # 3. Process Footnotes (<note place="foot">)
-    for note in soup.find_all('note', {'place': 'foot'}):
+    else:
+        #  It's a FIGURE (or has no type), run figure logic 
         try:
-            note_id = note.get('xml:id')
-            if not note_id:
-                continue
-                
-            chunk_text = note.get_text(strip=True)
+            fig_id = fig.get(_XML_ID)
+            if not fig_id:
+                return
+
+            caption_tag = fig.find('.//{*}head')
+            caption = _text(caption_tag) if caption_tag is not None else f"Figure ({fig_id})"
+
+            desc_tag = fig.find('.//{*}figDesc')
+            desc = _text(desc_tag) if desc_tag is not None else ""
+
+            chunk_text = f"Caption: {caption}\n\nDescription: {desc}".strip()
             if chunk_text:
-                heading = f"Footnote {note_id.replace('foot_', '')}"
-                entity_cache[note_id] = {
-                    "chunk_kind": "footnote",
-                    "heading_path": heading,
+                entity_cache[fig_id] = {
+                    "chunk_kind": "caption",
+                    "heading_path": caption,
                     "chunk_text": chunk_text
                 }
         except Exception as e:
-            print(f"    - WARNING: Skipping a footnote due to unexpected error: {e}")
-            continue
-            
-    print(f"Step A Complete. Cached {len(entity_cache)} entities.")
-    return entity_cache
+            print(f"    - WARNING: Skipping a figure due to unexpected error: {e}")
+            return
+
+
+def _cache_footnote(note, entity_cache: Dict) -> None:
+    """Turns one <note place="foot"> into a chunk-ready entity."""
+    try:
+        note_id = note.get(_XML_ID)
+        if not note_id:
+            return
+
+        chunk_text = _text(note)
+        if chunk_text:
+            heading = f"Footnote {note_id.replace('foot_', '')}"
+            entity_cache[note_id] = {
+                "chunk_kind": "footnote",
+                "heading_path": heading,
+                "chunk_text": chunk_text
+            }
+    except Exception as e:
+        print(f"    - WARNING: Skipping a footnote due to unexpected error: {e}")
+        return
 
 
-def process_narrative_and_create_links(soup, tokenizer):
+def _in_body(el, body) -> bool:
+    for ancestor in el.iterancestors('{*}body'):
+        return ancestor == body
+    return False
+
+
+def process_document(root, tokenizer, output_dir="structured_tables"):
     """
-    Processes the main text, creating narrative chunks and recording outbound
-    references to entities in their metadata. Also tracks page numbers.
+    Walks the document once, in order, caching every referenced entity (tables,
+    figures, footnotes) and collecting body paragraphs by heading path with their
+    outbound references and pages. Returns (entity_cache, narrative_chunks).
     """
-    print("--- Starting Step B: Processing Narrative and Creating Links ---")
+    print("--- Starting Steps A+B: Caching Entities and Processing Narrative in One Pass ---")
     
-    narrative_chunks = []
-    current_page = 1
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Kept apart so footnotes still follow all figures/tables in the cache, as before
+    figures, footnotes = {}, {}
     
-    body = soup.body
-    if not body:
+    body = root.find('.//{*}body')
+    if body is None:
         print("    - No <body> tag found. Skipping narrative processing.")
-        return []
-        
-    content_elements = body.find_all(['head', 'p', 'pb'])
-    if not content_elements:
-        print("    - No <head>, <p>, or <pb> tags found in <body>. Skipping narrative processing.")
-        return []
         
     sections = {}
     current_headings = []
+    current_path = "Introduction"  # " > ".join(current_headings), rebuilt only when a <head> arrives
+    current_page = 1
+    awaiting_end_page = []  # paragraphs whose page_end is the 'n' of the next <pb>
     
-    for element in content_elements:
+    for element in root.iter('{*}figure', '{*}note', '{*}head', '{*}p', '{*}pb'):
+        name = etree.QName(element).localname
+        if name == 'figure':
+            _cache_figure(element, figures, output_dir)
+            continue
+        if name == 'note':
+            if element.get('place') == 'foot':
+                _cache_footnote(element, footnotes)
+            continue
+        if body is None or not _in_body(element, body):
+            continue
         try:
-            if element.name == 'pb':
+            if name == 'pb':
+                n = element.get('n')
+                if n is not None:
+                    for p_data in awaiting_end_page:
+                        p_data['page_end'] = int(n)
+                awaiting_end_page.clear()
                 current_page = int(element.get('n', current_page))
                 continue
                 
             start_page = current_page
             
-            if element.name == 'head':
-                current_headings.append(element.get_text(strip=True))
-            elif element.name == 'p':
-                path = " > ".join(current_headings) if current_headings else "Introduction"
+            if name == 'head':
+                current_headings.append(_text(element))
+                current_path = " > ".join(current_headings)
+            elif name == 'p':
+                path = current_path
                 if path not in sections:
                     sections[path] = []
                 
                 references = []
-                for ref in element.find_all('ref'):
+                for ref in element.iter('{*}ref'):
                     references.append({
-                        "text_in_chunk": ref.get_text(strip=True),
+                        "text_in_chunk": _text(ref),
                         "type": ref.get("type"),
                         "target_id": ref.get("target", "").replace("#", "")
                     })
                 
-                #  SAFE PAGE FIND 
-                end_page_tag = element.find_next('pb')
-                end_page = int(end_page_tag.get('n', current_page)) if end_page_tag else current_page
-                
-                text_content = element.get_text(strip=True)
+                text_content = _text(element)
                 if text_content: 
-                    sections[path].append({
+                    # page_end stays at the current page unless a later <pb> resolves it
+                    p_data = {
                         "text": text_content,
                         "references": references,
                         "page_start": start_page,
-                        "page_end": end_page
-                    })
+                        "page_end": start_page
+                    }
+                    sections[path].append(p_data)
+                    awaiting_end_page.append(p_data)
         except Exception as e:
             print(f"    - WARNING: Skipping a narrative element due to unexpected error: {e}")
             continue
-            
+    
+    entity_cache = {**figures, **footnotes}
+    print(f"Step A Complete. Cached {len(entity_cache)} entities.")
+    
+    narrative_chunks = _pack_sections(sections, tokenizer)
+    print(f"Step B Complete. Created {len(narrative_chunks)} narrative chunks.")
+    return entity_cache, narrative_chunks
+
+
+def _pack_sections(sections: Dict[str, List[Dict]], tokenizer) -> List[Dict]:
+    """Packs each section's paragraphs into ~700-token narrative chunks with a 60-token overlap."""
+    narrative_chunks = []
+    
+    # Encode every paragraph in one batched call instead of once per paragraph. Paragraphs are
+    # encoded individually rather than as one joined section: cl100k merges trailing punctuation
+    # with the following "\n\n", so a joined encoding has no clean per-paragraph token boundaries
+    # to cut windows (and their references/pages) at.
+    all_paragraphs = [p_data for paragraphs_data in sections.values() for p_data in paragraphs_data]
+    # Runs inside a ProcessPoolExecutor worker, one per core already: don't fan out threads too.
+    token_lists = tokenizer.encode_ordinary_batch([p_data['text'] for p_data in all_paragraphs], num_threads=1)
+    for p_data, ids in zip(all_paragraphs, token_lists):
+        p_data['token_ids'] = ids
+    sep_ids = tokenizer.encode_ordinary("\n\n")
    
     for heading, paragraphs_data in sections.items():
         current_texts, current_refs, current_pages = [], [], []
+        current_ids: List[int] = []  # token ids of the chunk being built, used to cut the overlap
         current_tokens = 0
         
         for p_data in paragraphs_data:
             text = p_data['text']
-            tokens = count_tokens(text, tokenizer)
+            ids = p_data['token_ids']
+            tokens = len(ids)
             
             if current_tokens > 0 and current_tokens + tokens > 700:
                 chunk_text = "\n\n".join(current_texts)
@@ -229,12 +274,16 @@ def process_narrative_and_create_links(soup, tokenizer):
                         "page_end": max(current_pages) if current_pages else 1
                     }
                 })
-                overlap_text = tokenizer.decode(tokenizer.encode(chunk_text)[-60:])
+                overlap_ids = current_ids[-60:]
+                overlap_text = tokenizer.decode(overlap_ids)
+                current_ids = overlap_ids + sep_ids + ids
                 current_texts = [overlap_text, text]
                 current_refs = p_data['references']
                 current_pages = [p_data['page_start'], p_data['page_end']]
-                current_tokens = count_tokens("\n\n".join(current_texts), tokenizer)
+                current_tokens = len(overlap_ids) + tokens
             else:
+                if current_ids: current_ids.extend(sep_ids)
+                current_ids.extend(ids)
                 current_texts.append(text)
                 current_refs.extend(p_data['references'])
                 current_pages.extend([p_data['page_start'], p_data['page_end']])
@@ -252,7 +301,6 @@ def process_narrative_and_create_links(soup, tokenizer):
                 }
             })
             
-    print(f"Step B Complete. Created {len(narrative_chunks)} narrative chunks.")
     return narrative_chunks
 
 def finalize_chunks_with_metadata(narrative_chunks: List[Dict], entity_cache: Dict, doc_meta: Dict):
@@ -261,60 +309,48 @@ def finalize_chunks_with_metadata(narrative_chunks: List[Dict], entity_cache: Di
     """
     print("--- Starting Step C: Finalizing Metadata and Cross-Linking ---")
     
-    for i, chunk in enumerate(narrative_chunks):
-        chunk['chunk_id'] = f"{doc_meta['doc_id']}-{i}"
-        
-    for entity_id, entity_chunk in entity_cache.items():
-        if "metadata_extras" not in entity_chunk:
-            entity_chunk["metadata_extras"] = {}
-        entity_chunk["metadata_extras"]["referenced_in"] = []
-
-    for narrative_chunk in narrative_chunks:
-        #  SAFE GET 
-        if "references" in narrative_chunk.get("metadata_extras", {}):
-            for ref in narrative_chunk["metadata_extras"]["references"]:
-                target_id = ref.get("target_id")
-                if target_id in entity_cache:
-                   
-                    if "referenced_in" not in entity_cache[target_id].get("metadata_extras", {}):
-                         entity_cache[target_id]["metadata_extras"]["referenced_in"] = []
-                    entity_cache[target_id]["metadata_extras"]["referenced_in"].append(narrative_chunk['chunk_id'])
-
-    # Combine all chunks
-    all_chunks = narrative_chunks + list(entity_cache.values())
-    final_packaged_chunks = []
+    doc_id = doc_meta['doc_id']
+    # "chunk_id" is a placeholder here so it keeps its place in the key order; package() fills it in
+    doc_fields = {k: doc_meta.get(k) for k in (
+        "doc_id", "chunk_id", "tier", "source_type", "title", "filing_type",
+        "filing_date", "company", "ticker", "created_at",
+    )}
     
-    for i, chunk in enumerate(all_chunks):
-        chunk_id = chunk.get('chunk_id', f"{doc_meta['doc_id']}-{i}")
-        
+    def package(chunk: Dict, chunk_id: str) -> Dict:
         packaged_chunk = {
-            "doc_id": doc_meta.get("doc_id"),
+            **doc_fields,
             "chunk_id": chunk_id,
-            "tier": doc_meta.get("tier"),
-            "source_type": doc_meta.get("source_type"),
-            "title": doc_meta.get("title"),
-            "filing_type": doc_meta.get("filing_type"),
-            "filing_date": doc_meta.get("filing_date"),
-            "company": doc_meta.get("company"),
-            "ticker": doc_meta.get("ticker"),
-            "created_at": doc_meta.get("created_at"),
             "chunk_kind": chunk.get("chunk_kind"),
             "heading_path": chunk.get("heading_path"),
             "chunk_text": chunk.get("chunk_text"),
             "page_start": 1, 
             "page_end": 1
         }
-        
         if "metadata_extras" in chunk:
             packaged_chunk.update(chunk["metadata_extras"])
-            
-        final_packaged_chunks.append(packaged_chunk)
+        return packaged_chunk
+    
+    final_packaged_chunks = []
+    
+    # Narratives: assign the id, link it into every entity it references, and package, in one pass
+    for i, chunk in enumerate(narrative_chunks):
+        chunk_id = chunk['chunk_id'] = f"{doc_id}-{i}"
+        for ref in chunk.get("metadata_extras", {}).get("references", ()):
+            target = entity_cache.get(ref.get("target_id"))
+            if target is not None:
+                target.setdefault("metadata_extras", {}).setdefault("referenced_in", []).append(chunk_id)
+        final_packaged_chunks.append(package(chunk, chunk_id))
+    
+    # Entities are packaged last so their referenced_in lists are complete
+    for i, chunk in enumerate(entity_cache.values(), start=len(narrative_chunks)):
+        chunk.setdefault("metadata_extras", {}).setdefault("referenced_in", [])
+        final_packaged_chunks.append(package(chunk, chunk.get('chunk_id', f"{doc_id}-{i}")))
         
     print(f"Step C Complete. Finalized {len(final_packaged_chunks)} total chunks.")
     return final_packaged_chunks
 
 
-def extract_document_metadata(soup: BeautifulSoup) -> Dict[str, Any]:
+def extract_document_metadata(root: etree._Element) -> Dict[str, Any]:
     """Extracts high-level metadata from the document's TEI header."""
     
     title_tag = None
@@ -322,11 +358,11 @@ def extract_document_metadata(soup: BeautifulSoup) -> Dict[str, Any]:
     
     try:
        
-        title_stmt = soup.find('titleStmt')
-        if title_stmt:
-            title_tag = title_stmt.find('title')
-            if title_tag:
-                title = title_tag.get_text(strip=True)
+        title_stmt = root.find('.//{*}titleStmt')
+        if title_stmt is not None:
+            title_tag = title_stmt.find('.//{*}title')
+            if title_tag is not None:
+                title = _text(title_tag)
     except Exception as e:
         print(f"    - WARNING: Could not parse title. Using default. Error: {e}")
 
@@ -344,48 +380,68 @@ def extract_document_metadata(soup: BeautifulSoup) -> Dict[str, Any]:
     }
 
 
-def process_single_file(input_path: str, output_dir: str):
+def write_chunks_json(path: str, chunks: List[Dict[str, Any]]) -> None:
+    """Writes chunks as a JSON array, one compact chunk per line, through a 1 MiB buffer."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(b'[\n')
+        for i, chunk in enumerate(chunks):
+            if i: f.write(b',\n')
+            f.write(orjson.dumps(chunk))
+        f.write(b'\n]\n')
+
+
+def process_single_file(input_path: str, output_dir: str, debug: bool = False) -> Optional[str]:
     """
     Runs the full V3 chunking pipeline on a single XML file.
+    Returns a one-line error message if the file failed, else None.
     """
     try:
         print(f"  Processing file: {os.path.basename(input_path)}")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-        
-        soup = BeautifulSoup(xml_content, 'lxml-xml')
+        root = etree.parse(input_path).getroot()
         tokenizer = get_tokenizer()
         
-        doc_meta = extract_document_metadata(soup)
-        entity_cache = preprocess_and_cache_entities(soup, tokenizer)
-        narrative_chunks = process_narrative_and_create_links(soup, tokenizer)
+        doc_meta = extract_document_metadata(root)
+        entity_cache, narrative_chunks = process_document(root, tokenizer)
         final_output = finalize_chunks_with_metadata(narrative_chunks, entity_cache, doc_meta)
         
         base_name = os.path.basename(input_path)
         output_filename = os.path.join(output_dir, f"{base_name}.json")
         
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(final_output, f, indent=2)
+        write_chunks_json(output_filename, final_output)
+        return None
 
     except Exception as e:
-        
-        print(f"    ✗ FAILED to process {os.path.basename(input_path)}: {e}")
-        import traceback
-        traceback.print_exc() # This will print the exact line where the error occurred
+        message = f"{os.path.basename(input_path)}: {e}"
+        print(f"    ✗ FAILED to process {message}")
+        if debug:
+            import traceback
+            traceback.print_exc() # This will print the exact line where the error occurred
+        return message
+
 
+def run(input_dir: str, output_dir: str, debug: bool = False) -> None:
+    """
+    Runs the Filings chunking pipeline on every XML file in input_dir.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"--- Starting Filings Pipeline for {input_dir} ---")
+    with os.scandir(input_dir) as it:
+        file_paths = [e.path for e in it if e.is_file() and e.name.lower().endswith(".xml")]
+    # Files are independent, so fan them out across processes
+    with ProcessPoolExecutor() as executor:
+        failures = [msg for msg in executor.map(partial(process_single_file, output_dir=output_dir, debug=debug), file_paths) if msg]
+            
+    if failures:
+        print(f"--- {len(failures)} file(s) failed ---")
+        for msg in failures:
+            print(f"    ✗ {msg}")
+    print(f"--- Filings Pipeline complete for {input_dir} ---")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run V3 Filings chunking pipeline.")
     parser.add_argument("--input_dir", required=True, help="Directory containing raw .xml files.")
     parser.add_argument("--output_dir", required=True, help="Directory to save the final .json chunk files.")
+    parser.add_argument("--debug", action="store_true", help="Print full tracebacks for files that fail.")
     args = parser.parse_args()
-
-    os.makedirs(args.output_dir, exist_ok=True)
-    
-    print(f"--- Starting Filings Pipeline for {args.input_dir} ---")
-    for filename in os.listdir(args.input_dir):
-        if filename.lower().endswith(".xml"):
-            file_path = os.path.join(args.input_dir, filename)
-            process_single_file(file_path, args.output_dir)
-            
-    print(f"--- Filings Pipeline complete for {args.input_dir} ---")
\ No newline at end of file
+    run(args.input_dir, args.output_dir, debug=args.debug)
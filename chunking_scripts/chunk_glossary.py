@@ -1,39 +1,76 @@
 import os
-import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+import orjson
 import uuid
 from datetime import datetime, timezone
 import tiktoken
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
-
-
+from dataclasses import dataclass
+from typing import List, Dict, Any
+
+@dataclass(slots=True)
+class GlossaryChunk:
+    """One packaged glossary term; field order is the key order in the output JSON."""
+    doc_id: str
+    chunk_id: str
+    tier: int
+    source_type: str
+    title: str
+    heading_path: str
+    page_start: int
+    page_end: int
+    created_at: str
+    chunk_kind: str
+    term: str
+    aliases: List[str]
+    chunk_text: str
+    token_count: int
+
+# Direct <div> children of <body> that carry both a <head> (term) and a <p> (definition)
+_TERM_DIVS = etree.XPath(
+    "//*[local-name()='body']/*[local-name()='div'][*[local-name()='head'] and *[local-name()='p']]"
+)
+
+
+@lru_cache(maxsize=1)
 def get_tokenizer():
-    """Initializes and returns the tiktoken tokenizer."""
+    """Initializes and returns the tiktoken tokenizer (built once per process)."""
     return tiktoken.get_encoding("cl100k_base")
 
 def count_tokens(text, tokenizer):
     """Counts tokens in a text string."""
     return len(tokenizer.encode(text))
 
+def _text(el) -> str:
+    """Concatenates the stripped text nodes under an element (same output as bs4's get_text(strip=True))."""
+    if len(el) == 0:
+        # Leaf element (cells, heads, titles): its only text node is el.text
+        return (el.text or "").strip()
+    return "".join(t.strip() for t in el.itertext())
+
 def create_glossary_chunks(tei_xml_content):
     """
     Parses, filters, chunks, and packages glossary terms from a TEI XML file.
 
     Args:
-        tei_xml_content (str): The XML content of the glossary document.
+        tei_xml_content (str | bytes): The XML content of the glossary document.
 
     Returns:
-        list: A list of fully formatted and metadata-rich chunk dictionaries.
+        list: A list of fully formatted and metadata-rich GlossaryChunk records.
     """
     print("--- Starting Glossary Chunking Pipeline ---")
     
-    soup = BeautifulSoup(tei_xml_content, 'lxml-xml')
+    if isinstance(tei_xml_content, str):
+        tei_xml_content = tei_xml_content.encode('utf-8')
+    root = etree.fromstring(tei_xml_content)
     tokenizer = get_tokenizer()
 
-    title_tag = soup.find('title', type='main')
+    title_tag = root.find(".//{*}title[@type='main']")
     doc_meta = {
         "doc_id": str(uuid.uuid4()),
-        "title": title_tag.get_text(strip=True) if title_tag else "Financial Glossary",
+        "title": _text(title_tag) if title_tag is not None else "Financial Glossary",
         "tier": 1,
         "source_type": "foundational",
         "created_at": datetime.now(timezone.utc).isoformat()
@@ -43,18 +80,18 @@ def create_glossary_chunks(tei_xml_content):
     print("Step 1: Parsing XML and filtering introductory content...")
     
     headings_to_skip = ['FOREWORD', 'PREFACE', 'Acknowledgement']
-    all_divs = soup.body.find_all('div', recursive=False)
+    all_divs = _TERM_DIVS(root)
     
     raw_chunks = []
     current_page = 1
 
     for div in all_divs:
-        head_tag = div.find('head', recursive=False)
-        p_tag = div.find('p', recursive=False)
+        head_tag = div.find('{*}head')
+        p_tag = div.find('{*}p')
 
-        if head_tag and p_tag:
-            term = head_tag.get_text(strip=True)
-            definition = p_tag.get_text(strip=True)
+        if head_tag is not None and p_tag is not None:
+            term = _text(head_tag)
+            definition = _text(p_tag)
 
             if term.upper() in headings_to_skip or len(term) == 1:
                 print(f"  - Skipping section: '{term}'")
@@ -72,6 +109,9 @@ def create_glossary_chunks(tei_xml_content):
 
     print("Step 3: Packaging all chunks with detailed metadata...")
     packaged_chunks = []
+    # One batched encode for every term instead of a tokenizer call per chunk,
+    # single-threaded because this already runs in one of run()'s per-core workers
+    token_lists = tokenizer.encode_ordinary_batch([c["text"] for c in raw_chunks], num_threads=1)
     
     for i, chunk_data in enumerate(raw_chunks):
         term = chunk_data["term"]
@@ -80,29 +120,28 @@ def create_glossary_chunks(tei_xml_content):
         heading_path = f"Glossary › {first_letter} › {term}"
         
         chunk_text = chunk_data["text"]
-        token_count = count_tokens(chunk_text, tokenizer)
+        token_count = len(token_lists[i])
 
         min_tokens, max_tokens = 80, 180
         if not (min_tokens <= token_count <= max_tokens):
             print(f"  - Warning: Glossary chunk for '{term}' has {token_count} tokens (outside {min_tokens}-{max_tokens} range).")
 
-        packaged_chunks.append({
-           
-            "doc_id": doc_meta["doc_id"],
-            "chunk_id": f"{doc_meta['doc_id']}-{i}",
-            "tier": doc_meta["tier"],
-            "source_type": doc_meta["source_type"],
-            "title": doc_meta["title"],
-            "heading_path": heading_path,
-            "page_start": chunk_data["page"],
-            "page_end": chunk_data["page"],
-            "created_at": doc_meta["created_at"],
-            "chunk_kind": "glossary",
-            "term": term,
-            "aliases": [], 
-            "chunk_text": chunk_text,
-            "token_count": token_count
-        })
+        packaged_chunks.append(GlossaryChunk(
+            doc_id=doc_meta["doc_id"],
+            chunk_id=f"{doc_meta['doc_id']}-{i}",
+            tier=doc_meta["tier"],
+            source_type=doc_meta["source_type"],
+            title=doc_meta["title"],
+            heading_path=heading_path,
+            page_start=chunk_data["page"],
+            page_end=chunk_data["page"],
+            created_at=doc_meta["created_at"],
+            chunk_kind="glossary",
+            term=term,
+            aliases=[], 
+            chunk_text=chunk_text,
+            token_count=token_count
+        ))
 
     print(f"Step 3 Complete. Finalized {len(packaged_chunks)} glossary chunks.")
     return packaged_chunks
@@ -110,13 +149,24 @@ def create_glossary_chunks(tei_xml_content):
 import argparse
 import os
 
+def write_chunks_json(path: str, chunks: List[GlossaryChunk]) -> None:
+    """Writes chunks as a JSON array, one compact chunk per line, through a 1 MiB buffer."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(b'[\n')
+        for i, chunk in enumerate(chunks):
+            if i: f.write(b',\n')
+            f.write(orjson.dumps(chunk))
+        f.write(b'\n]\n')
+
+
 def process_single_file(input_path: str, output_dir: str):
     """
     Runs the full Glossary chunking pipeline on a single XML file.
     """
     try:
         print(f"  Processing file: {os.path.basename(input_path)}")
-        with open(input_path, 'r', encoding='utf-8') as f:
+        # Raw bytes go straight to lxml, which honours the XML encoding declaration
+        with open(input_path, 'rb') as f:
             xml_content = f.read()
         
         final_output = create_glossary_chunks(xml_content)
@@ -124,24 +174,29 @@ def process_single_file(input_path: str, output_dir: str):
         base_name = os.path.basename(input_path)
         output_filename = os.path.join(output_dir, f"{base_name}.json")
         
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(final_output, f, indent=2)
+        write_chunks_json(output_filename, final_output)
 
     except Exception as e:
         print(f"    ✗ FAILED to process {os.path.basename(input_path)}: {e}")
 
+def run(input_dir: str, output_dir: str) -> None:
+    """
+    Runs the Glossary chunking pipeline on every XML file in input_dir.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"--- Starting Glossary Pipeline for {input_dir} ---")
+    with os.scandir(input_dir) as it:
+        file_paths = [e.path for e in it if e.is_file() and e.name.lower().endswith(".xml")]
+    # Files are independent, so fan them out across processes
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(partial(process_single_file, output_dir=output_dir), file_paths))
+            
+    print(f"--- Glossary Pipeline complete for {input_dir} ---")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run Glossary chunking pipeline.")
     parser.add_argument("--input_dir", required=True, help="Directory containing raw .xml files.")
     parser.add_argument("--output_dir", required=True, help="Directory to save the final .json chunk files.")
     args = parser.parse_args()
-
-    os.makedirs(args.output_dir, exist_ok=True)
-    
-    print(f"--- Starting Glossary Pipeline for {args.input_dir} ---")
-    for filename in os.listdir(args.input_dir):
-        if filename.lower().endswith(".xml"):
-            file_path = os.path.join(args.input_dir, filename)
-            process_single_file(file_path, args.output_dir)
-            
-    print(f"--- Glossary Pipeline complete for {args.input_dir} ---")
\ No newline at end of file
+    run(args.input_dir, args.output_dir)
@@ -1,88 +1,110 @@
 import os
-import json
+import orjson
 import uuid
 from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import tiktoken
-from bs4 import BeautifulSoup
+from lxml import etree
 from collections import defaultdict
 import re
+from typing import List, Dict, Any
 
 
+@lru_cache(maxsize=1)
 def get_tokenizer():
-    """Initializes and returns the tiktoken tokenizer."""
+    """Initializes and returns the tiktoken tokenizer (built once per process)."""
     return tiktoken.get_encoding("cl100k_base")
 
 def count_tokens(text, tokenizer):
     """Counts tokens in a text string."""
     return len(tokenizer.encode(text))
 
+def _text(el) -> str:
+    """Concatenates the stripped text nodes under an element (same output as bs4's get_text(strip=True))."""
+    if len(el) == 0:
+        return (el.text or "").strip()
+    return "".join(t.strip() for t in el.itertext())
+
+HEADINGS_TO_SKIP = [
+    "Chapter Outline", "Community Hubs", "Technology Partners", "Summary",
+    "Key Terms", "Learning Outcomes", "Multiple Choice", "Review Questions",
+    "Problems", "Video Activity", "CFA Institute"
+]
+CONCEPT_BOX_HEADINGS = [
+    "CONCEPTS IN PRACTICE", "LINK TO LEARNING", "THINK IT THROUGH", "Why It Matters"
+]
+
+# Substring matchers, one C-level scan per heading instead of a Python loop over every title
+_SKIP_RE = re.compile("|".join(map(re.escape, HEADINGS_TO_SKIP)))
+_CONCEPT_BOX_RE = re.compile("|".join(map(re.escape, CONCEPT_BOX_HEADINGS)))
+_SPECIAL_DIV_RE = re.compile("|".join(map(re.escape, CONCEPT_BOX_HEADINGS + ["Key Terms"])))
+
 def classify_content_from_xml(tei_xml_content):
     """
     Parses, classifies, and filters content from the textbook XML.
     This is the core of the V3 strategy for textbooks.
     """
     print("--- Starting Step 1: Parsing, Classifying, and Filtering Content ---")
-    soup = BeautifulSoup(tei_xml_content, 'lxml-xml')
-    body = soup.find('body')
-    if not body: return []
-
-    headings_to_skip = [
-        "Chapter Outline", "Community Hubs", "Technology Partners", "Summary",
-        "Key Terms", "Learning Outcomes", "Multiple Choice", "Review Questions",
-        "Problems", "Video Activity", "CFA Institute"
-    ]
-    concept_box_headings = [
-        "CONCEPTS IN PRACTICE", "LINK TO LEARNING", "THINK IT THROUGH", "Why It Matters"
-    ]
+    if isinstance(tei_xml_content, str):
+        tei_xml_content = tei_xml_content.encode('utf-8')
+    root = etree.fromstring(tei_xml_content)
+    body = root.find('.//{*}body')
+    if body is None: return []
 
     classified_elements = []
     current_headings = []
     current_page = 1
     skip_current_section = False
+    # One flag per open <div>: does its heading name a concept box / Key Terms?
+    # The top of the stack answers "is this element inside one" without walking ancestors.
+    special_divs = []
     
-    for element in body.find_all(['head', 'p', 'formula', 'table', 'div', 'pb']):
+    for event, element in etree.iterwalk(body, events=('start', 'end'), tag=('{*}head', '{*}p', '{*}formula', '{*}table', '{*}div', '{*}pb')):
+        name = etree.QName(element).localname
+        if event == 'end':
+            if name == 'div': special_divs.pop()
+            continue
+
+        is_in_special_div = bool(special_divs) and special_divs[-1]
+        if name == 'div':
+            div_head = element.find('.//{*}head')
+            special_divs.append(div_head is not None and _SPECIAL_DIV_RE.search(_text(div_head)) is not None)
 
-        if element.name == 'pb':
+        if name == 'pb':
             current_page = int(element.get('n', current_page))
             continue
 
-        parent_div = element.find_parent('div')
-        is_in_special_div = parent_div and parent_div.find('head') and any(
-            box_title in parent_div.find('head').get_text(strip=True) for box_title in concept_box_headings + ["Key Terms"]
-        )
-        if is_in_special_div and element != parent_div:
+        if is_in_special_div:
             continue
 
-        if element.name == 'head':
-            heading_text = element.get_text(strip=True)
+        if name == 'head':
+            heading_text = _text(element)
             
             level = len(element.get('n', '1.1.1.1').split('.'))
             current_headings = current_headings[:level-1]
             current_headings.append(heading_text)
 
-            if any(skip_title in h for h in current_headings for skip_title in headings_to_skip):
-                skip_current_section = True
-            else:
-                skip_current_section = False
+            skip_current_section = any(_SKIP_RE.search(h) for h in current_headings)
             continue
 
         if skip_current_section:
             continue
 
         element_type = 'unknown'
-        content_text = element.get_text(strip=True)
+        content_text = _text(element)
         heading_path = " › ".join(current_headings)
 
-        if element.name == 'p' and content_text: element_type = 'paragraph'
-        elif element.name == 'formula': element_type = 'formula_box'
-        elif element.name == 'table': element_type = 'table'
-        elif element.name == 'div':
-            div_head_tag = element.find('head', recursive=False)
-            if div_head_tag:
-                div_head_text = div_head_tag.get_text(strip=True)
-                if any(box_title in div_head_text for box_title in concept_box_headings):
+        if name == 'p' and content_text: element_type = 'paragraph'
+        elif name == 'formula': element_type = 'formula_box'
+        elif name == 'table': element_type = 'table'
+        elif name == 'div':
+            div_head_tag = element.find('{*}head')
+            if div_head_tag is not None:
+                div_head_text = _text(div_head_tag)
+                if _CONCEPT_BOX_RE.search(div_head_text):
                     element_type, heading_path = 'concept_box', f"{heading_path} › {div_head_text}"
-                    content_text = element.get_text(strip=True)
+                    content_text = _text(element)
 
         if element_type != 'unknown' and content_text:
             classified_elements.append({
@@ -110,15 +132,23 @@ def chunk_boxed_content(classified_elements, tokenizer):
     print(f"Step 2 Complete. Created {len(boxed_chunks)} formula/concept box chunks.")
     return boxed_chunks
 
-def split_long_paragraph(text, tokenizer, max_tokens=350, overlap_tokens=50):
-    tokens = tokenizer.encode(text)
-    if len(tokens) <= 400: return [text]
-    windows, step_size = [], max_tokens - overlap_tokens
-    for i in range(0, len(tokens), step_size):
-        window_tokens = tokens[i: i + max_tokens]
-        windows.append(tokenizer.decode(window_tokens))
-        if i + max_tokens >= len(tokens): break
-    return windows
+def _window_bounds(n_tokens, window, overlap):
+    """(start, end) slices of sliding token windows; the last window is the first to reach the end."""
+    if n_tokens == 0: return []
+    step = window - overlap
+    last_start = max(0, -(-(n_tokens - window) // step)) * step
+    return [(i, i + window) for i in range(0, last_start + 1, step)]
+
+def _paragraph_windows(text, tokens, tokenizer, max_tokens=350, overlap_tokens=50):
+    """Same windows as split_long_paragraph, each paired with its token ids."""
+    if len(tokens) <= 400: return [(text, tokens)]
+    window_ids = [tokens[s:e] for s, e in _window_bounds(len(tokens), max_tokens, overlap_tokens)]
+    return [(tokenizer.decode(ids), ids) for ids in window_ids]
+
+def split_long_paragraph(text, tokenizer, max_tokens=350, overlap_tokens=50, tokens=None):
+    if tokens is None:
+        tokens = tokenizer.encode_ordinary(text)
+    return [window for window, _ in _paragraph_windows(text, tokens, tokenizer, max_tokens, overlap_tokens)]
 
 def chunk_narrative_content(classified_elements, tokenizer):
     print("--- Starting Step 3: Chunking Main Narrative Text ---")
@@ -127,27 +157,38 @@ def chunk_narrative_content(classified_elements, tokenizer):
         if element['type'] == 'paragraph':
             sections[element['heading_path']].append(element)
 
+    # Encode every paragraph in one batched call instead of once per paragraph
+    all_paragraphs = [p_data for paragraphs_data in sections.values() for p_data in paragraphs_data]
+    # One thread: run() already spreads files over a process per core.
+    token_lists = tokenizer.encode_ordinary_batch([p_data['text'] for p_data in all_paragraphs], num_threads=1)
+    for p_data, ids in zip(all_paragraphs, token_lists):
+        p_data['token_ids'] = ids
+    sep_ids = tokenizer.encode_ordinary("\n\n")
+
     all_narrative_chunks = []
     for heading, paragraphs_data in sections.items():
         text_blocks = []
         for p_data in paragraphs_data:
-            for window in split_long_paragraph(p_data['text'], tokenizer):
-                text_blocks.append({"text": window, "page": p_data['page']})
+            for window, window_ids in _paragraph_windows(p_data['text'], p_data['token_ids'], tokenizer):
+                text_blocks.append({"text": window, "token_ids": window_ids, "page": p_data['page']})
         
-        current_texts, current_pages = [], []
+        # Token ids of "\n\n".join(current_texts), extended on append instead of re-encoding
+        current_texts, current_pages, current_ids = [], [], []
         for block in text_blocks:
+            if current_texts: current_ids.extend(sep_ids)
             current_texts.append(block['text'])
             current_pages.append(block['page'])
-            potential_chunk = "\n\n".join(current_texts)
-            token_count = count_tokens(potential_chunk, tokenizer)
+            current_ids.extend(block['token_ids'])
             
-            if token_count >= 400:
+            if len(current_ids) >= 400:
+                potential_chunk = "\n\n".join(current_texts)
                 all_narrative_chunks.append({
                     "chunk_kind": "concept", "heading_path": heading, "chunk_text": potential_chunk,
                     "page_start": min(current_pages), "page_end": max(current_pages)
                 })
-                overlap_text = tokenizer.decode(tokenizer.encode(potential_chunk)[-50:])
-                current_texts, current_pages = [overlap_text], [max(current_pages)]
+                tail_ids = current_ids[-50:]
+                overlap_text = tokenizer.decode(tail_ids)
+                current_texts, current_pages, current_ids = [overlap_text], [max(current_pages)], tail_ids
 
         if len(current_texts) > 1 or (current_texts and not current_texts[0].startswith("...")):
             final_text = "\n\n".join(current_texts)
@@ -185,13 +226,24 @@ def finalize_chunks_with_metadata(all_raw_chunks, doc_meta):
 import argparse
 import os
 
+def write_chunks_json(path: str, chunks: List[Dict[str, Any]]) -> None:
+    """Writes chunks as a JSON array, one compact chunk per line, through a 1 MiB buffer."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(b'[\n')
+        for i, chunk in enumerate(chunks):
+            if i: f.write(b',\n')
+            f.write(orjson.dumps(chunk))
+        f.write(b'\n]\n')
+
+
 def process_single_file(input_path: str, output_dir: str):
     """
     Runs the full Textbook chunking pipeline on a single XML file.
     """
     try:
         print(f"  Processing file: {os.path.basename(input_path)}")
-        with open(input_path, 'r', encoding='utf-8') as f:
+        # Raw bytes go straight to lxml, which honours the XML encoding declaration
+        with open(input_path, 'rb') as f:
             xml_content = f.read()
             
         tokenizer = get_tokenizer()
@@ -211,24 +263,28 @@ def process_single_file(input_path: str, output_dir: str):
         
         output_filename = os.path.join(output_dir, f"{base_name}.json")
         
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(final_output, f, indent=2)
+        write_chunks_json(output_filename, final_output)
 
     except Exception as e:
         print(f"  FAILED to process {os.path.basename(input_path)}: {e}")
 
+def run(input_dir: str, output_dir: str) -> None:
+    """
+    Runs the Textbook chunking pipeline on every XML file in input_dir.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"--- Starting Textbook Pipeline for {input_dir} ---")
+    file_paths = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(".xml")]
+    # Files are independent, so fan them out across processes; each worker builds its own tokenizer
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(partial(process_single_file, output_dir=output_dir), file_paths, chunksize=4))
+            
+    print(f"--- Textbook Pipeline complete for {input_dir} ---")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run Textbook chunking pipeline.")
     parser.add_argument("--input_dir", required=True, help="Directory containing raw .xml files.")
     parser.add_argument("--output_dir", required=True, help="Directory to save the final .json chunk files.")
     args = parser.parse_args()
-
-    os.makedirs(args.output_dir, exist_ok=True)
-    
-    print(f"--- Starting Textbook Pipeline for {args.input_dir} ---")
-    for filename in os.listdir(args.input_dir):
-        if filename.lower().endswith(".xml"):
-            file_path = os.path.join(args.input_dir, filename)
-            process_single_file(file_path, args.output_dir)
-            
-    print(f"--- Textbook Pipeline complete for {args.input_dir} ---")
\ No newline at end of file
+    run(args.input_dir, args.output_dir)
@@ -1,61 +1,78 @@
 import os
-import json
+import orjson
 import uuid
 from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import tiktoken
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
+from typing import List, Dict, Any
 
+@lru_cache(maxsize=1)
 def get_tokenizer():
-    """Initializes and returns the tiktoken tokenizer."""
+    """Initializes and returns the tiktoken tokenizer (built once per process)."""
     return tiktoken.get_encoding("cl100k_base")
 
 def count_tokens(text, tokenizer):
     """Counts tokens in a text string."""
     return len(tokenizer.encode(text))
 
-def split_text_for_transcript(text, tokenizer, max_tokens=220, overlap_tokens=40):
+def _text(el) -> str:
+    """Concatenates the stripped text nodes under an element (same output as bs4's get_text(strip=True))."""
+    if len(el) == 0:
+        return (el.text or "").strip()
+    return "".join(t.strip() for t in el.itertext())
+
+# Every <div>, at any depth, that directly holds a <head> (speaker) and at least one <p> (speech)
+_SPEAKER_DIVS = etree.XPath(
+    "//*[local-name()='div'][*[local-name()='head'] and *[local-name()='p']]"
+)
+# "Name -- Role -- ..." speaker headings; only the first two parts are used
+_SPEAKER_SPLIT_RE = re.compile(r"\s*--\s*")
+
+def _window_bounds(n_tokens, window, overlap):
+    """(start, end) slices of sliding token windows; the last window is the first to reach the end."""
+    if n_tokens == 0: return []
+    step = window - overlap
+    last_start = max(0, -(-(n_tokens - window) // step)) * step
+    return [(i, i + window) for i in range(0, last_start + 1, step)]
+
+def split_text_for_transcript(text, tokenizer, max_tokens=220, overlap_tokens=40, tokens=None):
     """
     Splits a long speaker turn into smaller, overlapping windows.
     (180-220 token windows with 40-token overlap)
     """
     target_window_size = 200 
     
-    tokens = tokenizer.encode(text)
+    if tokens is None:
+        tokens = tokenizer.encode(text)
     if len(tokens) <= max_tokens:
         return [text]
         
-    windows = []
-    step = target_window_size - overlap_tokens
-    for i in range(0, len(tokens), step):
-        window_tokens = tokens[i: i + target_window_size]
-        windows.append(tokenizer.decode(window_tokens))
-        if i + target_window_size >= len(tokens):
-            break
-            
-    return windows
+    return [tokenizer.decode(tokens[s:e]) for s, e in _window_bounds(len(tokens), target_window_size, overlap_tokens)]
 
 
-def extract_speaker_turns(soup):
+def extract_speaker_turns(root):
     """
     Step 1: Extracts all speaker turns from both <profileDesc> and <body>.
     A speaker turn is defined as a <div> with a <head> (speaker) and <p> (speech).
     """
     print("--- Step 1: Extracting Speaker Turns ---")
     raw_turns = []
-    speaker_divs = soup.find_all('div', recursive=True)
+    speaker_divs = _SPEAKER_DIVS(root)
     
     for div in speaker_divs:
-        head = div.find('head', recursive=False)
-        paragraphs = div.find_all('p', recursive=False)
+        head = div.find('{*}head')
+        paragraphs = div.findall('{*}p')
         
-        if head and paragraphs:
-            speaker_text = head.get_text(strip=True)
-            parts = [p.strip() for p in speaker_text.split('--')]
-            name = parts[0]
-            role = parts[1] if len(parts) > 1 else "Participant"
+        if head is not None and paragraphs:
+            speaker_text = _text(head)
+            parts = _SPEAKER_SPLIT_RE.split(speaker_text, 2)
+            name = parts[0].strip()
+            role = parts[1].strip() if len(parts) > 1 else "Participant"
             
-            speech = "\n".join([p.get_text(strip=True) for p in paragraphs])
+            speech = "\n".join([_text(p) for p in paragraphs])
             
             if speech: 
                 raw_turns.append({"name": name, "role": role, "speech": speech})
@@ -71,14 +88,17 @@ def chunk_and_segment_turns(raw_turns, tokenizer):
     print("--- Steps 2 & 3: Segmenting and Chunking Turns ---")
     segmented_chunks = []
     segment = "Prepared Remarks" 
+    # Each speech is encoded once, in one batched call, and the ids reused for splitting
+    # Single-threaded on purpose; each pool worker is one of cpu_count processes.
+    token_lists = tokenizer.encode_ordinary_batch([turn["speech"] for turn in raw_turns], num_threads=1)
     
-    for turn in raw_turns:
+    for turn, speech_ids in zip(raw_turns, token_lists):
         
         if "analyst" in turn["role"].lower() or "questions" in turn["name"].lower():
             segment = "Q&A"
         
         speech_text = turn["speech"]
-        token_count = count_tokens(speech_text, tokenizer)
+        token_count = len(speech_ids)
         
         if token_count <= 220:
             
@@ -90,7 +110,7 @@ def chunk_and_segment_turns(raw_turns, tokenizer):
             })
         else:
            
-            windows = split_text_for_transcript(speech_text, tokenizer)
+            windows = split_text_for_transcript(speech_text, tokenizer, tokens=speech_ids)
             for window_text in windows:
                 segmented_chunks.append({
                     "name": turn["name"],
@@ -140,16 +160,24 @@ def package_transcript_chunks(chunks, doc_meta):
 import argparse
 import os
 
+def write_chunks_json(path: str, chunks: List[Dict[str, Any]]) -> None:
+    """Writes chunks as a JSON array, one compact chunk per line, through a 1 MiB buffer."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(b'[\n')
+        for i, chunk in enumerate(chunks):
+            if i: f.write(b',\n')
+            f.write(orjson.dumps(chunk))
+        f.write(b'\n]\n')
+
+
 def process_single_file(input_path: str, output_dir: str):
     """
     Runs the full Transcript chunking pipeline on a single XML file.
     """
     try:
         print(f"  Processing file: {os.path.basename(input_path)}")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-            
-        soup = BeautifulSoup(xml_content, 'lxml-xml')
+        # lxml reads and parses the file in C; no Python str copy of the document
+        root = etree.parse(input_path).getroot()
         tokenizer = get_tokenizer()
 
         base_name = os.path.basename(input_path)
@@ -161,31 +189,35 @@ def process_single_file(input_path: str, output_dir: str):
             "tier": 2, "source_type": "transcript",
             "created_at": datetime.now(timezone.utc).isoformat()
         }
-        raw_speaker_turns = extract_speaker_turns(soup)
+        raw_speaker_turns = extract_speaker_turns(root)
         segmented_and_chunked = chunk_and_segment_turns(raw_speaker_turns, tokenizer)
         final_output = package_transcript_chunks(segmented_and_chunked, doc_meta)
         
         output_filename = os.path.join(output_dir, f"{base_name}.json")
         
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(final_output, f, indent=2)
+        write_chunks_json(output_filename, final_output)
 
     except Exception as e:
         print(f"    ✗ FAILED to process {os.path.basename(input_path)}: {e}")
 
 # MAIN ORCHESTRATION SCRIPT
+def run(input_dir: str, output_dir: str) -> None:
+    """
+    Runs the Transcript chunking pipeline on every XML file in input_dir.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"--- Starting Transcript Pipeline for {input_dir} ---")
+    file_paths = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(".xml")]
+    # Files are independent, so fan them out across processes; each worker builds its own tokenizer
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(partial(process_single_file, output_dir=output_dir), file_paths, chunksize=4))
+            
+    print(f"--- Transcript Pipeline complete for {input_dir} ---")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run Transcript chunking pipeline.")
     parser.add_argument("--input_dir", required=True, help="Directory containing raw .xml files.")
     parser.add_argument("--output_dir", required=True, help="Directory to save the final .json chunk files.")
     args = parser.parse_args()
-
-    os.makedirs(args.output_dir, exist_ok=True)
-    
-    print(f"--- Starting Transcript Pipeline for {args.input_dir} ---")
-    for filename in os.listdir(args.input_dir):
-        if filename.lower().endswith(".xml"):
-            file_path = os.path.join(args.input_dir, filename)
-            process_single_file(file_path, args.output_dir)
-            
-    print(f"--- Transcript Pipeline complete for {args.input_dir} ---")
\ No newline at end of file
+    run(args.input_dir, args.output_dir)
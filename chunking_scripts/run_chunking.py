@@ -1,9 +1,30 @@
 import json
+import importlib
 import subprocess
 import sys
 import os
 import argparse
 
+def _load_chunker(script_path: str):
+    """
+    Imports a chunking script as a module (chunking_scripts/chunk_filings.py ->
+    chunking_scripts.chunk_filings) so its run() can be called in this process.
+    Returns None if the script can't be imported that way.
+    """
+    rel_path = os.path.relpath(script_path)
+    if rel_path.startswith(".."):
+        return None
+    module_name = os.path.splitext(rel_path)[0].replace(os.sep, ".")
+    # The project root must be importable here and in the scripts' worker processes
+    project_root = os.getcwd()
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        print(f"Could not import {script_path} ({e}); falling back to a subprocess.")
+        return None
+
 def run_task(task: dict):
     """
     Runs a single chunking task defined in the config.
@@ -28,11 +49,24 @@ def run_task(task: dict):
     # 3. Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
     
-    # 4. Get the python executable from the current virtual environment
+    # 4. Run the script in-process when it exposes run(), so imports (tokenizer, lxml, ...)
+    # are paid once for the whole config instead of once per task
+    chunker = _load_chunker(script_path)
+    if chunker is not None and hasattr(chunker, "run"):
+        print(f"Running {script_path} in-process")
+        try:
+            chunker.run(input_dir, output_dir)
+            print(f"Success: {task_name}")
+        except Exception as e:
+            print(f" FAILED: {task_name} returned an error.")
+            print(f"Error: {e}\n")
+        return
+
+    # 5. Otherwise, get the python executable from the current virtual environment
     # This ensures we use the Python from '.venv' with all our packages
     python_exe = sys.executable 
     
-    # 5. Build the command to run the script
+    # 6. Build the command to run the script
     command = [
         python_exe,
         script_path,
@@ -43,7 +77,7 @@ def run_task(task: dict):
     print(f"Executing: {' '.join(command)}")
     
     try:
-        # 6. Run the command
+        # 7. Run the command
         # We use 'check=True' so it will raise an error if the chunking script fails
         subprocess.run(command, check=True)
         print(f"Success: {task_name}")
@@ -2,8 +2,12 @@ from __future__ import annotations
 import os
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 import os
-import json
+import orjson
 import time
+import itertools
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import torch
 from pathlib import Path
@@ -20,6 +24,8 @@ DENSE_MODEL_PATH = os.getenv("DENSE_MODEL_PATH", "BAAI/bge-m3")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "financebot")
 BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "32"))
+# Optional cap on dense-model sequence length (tokens); unset keeps the model's own limit
+DENSE_MAX_SEQ_LENGTH = os.getenv("DENSE_MAX_SEQ_LENGTH")
 
 _pc = None
 _index = None
@@ -38,6 +44,11 @@ def _load_dense():
     if _dense_model is None:
         print(f"Loading dense model: {DENSE_MODEL_PATH} (to {_get_device()})")
         _dense_model = SentenceTransformer(DENSE_MODEL_PATH, device=_get_device())
+        if _get_device() == "cuda":
+            # Half-precision weights halve memory traffic and use the tensor cores
+            _dense_model.half()
+        if DENSE_MAX_SEQ_LENGTH:
+            _dense_model.max_seq_length = int(DENSE_MAX_SEQ_LENGTH)
         _dense_model.eval()
 
 def _load_splade():
@@ -45,6 +56,8 @@ def _load_splade():
     if _splade_model is None:
         print(f"Loading sparse model to {_get_device()}...")
         _splade_model = SpladeEncoder(device=_get_device())
+        if _get_device() == "cuda":
+            _splade_model.model.half()
 
 def connect_to_index() -> None:
     global _pc, _index
@@ -52,28 +65,47 @@ def connect_to_index() -> None:
     if _pc is None: _pc = Pinecone(api_key=PINECONE_API_KEY)
     _index = _pc.Index(PINECONE_INDEX_NAME)
 
-@torch.no_grad()
+@torch.inference_mode()
 def _encode_dense_batch(texts: List[str]) -> List[List[float]]:
     _load_dense()
     vecs = _dense_model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
-    return [v.tolist() for v in np.array(vecs)]
+    return np.asarray(vecs, dtype=np.float32).tolist()
 
+@torch.inference_mode()
 def _encode_sparse_batch(texts: List[str]) -> List[Dict[str, Any]]:
     _load_splade()
     return _splade_model.encode_documents(texts)
 
 def load_chunks_from_json(path: str) -> List[Dict[str, Any]]:
-    with open(Path(path), "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(Path(path), "rb") as f:
+        return orjson.loads(f.read())
+
+def iter_chunks_from_json(path: str) -> Iterable[Dict[str, Any]]:
+    """
+    Yields the chunks of one chunk file. Files written by the chunking scripts hold one
+    compact chunk per line and are streamed a line at a time; anything else is loaded whole.
+    """
+    with open(Path(path), "rb") as f:
+        first, second = f.readline(), f.readline()
+        if first.strip() == b"[" and second.startswith(b"{"):
+            for line in itertools.chain([second], f):
+                line = line.rstrip()
+                if line.endswith(b","): line = line[:-1]
+                if line and line != b"]":
+                    yield orjson.loads(line)
+            return
+    yield from load_chunks_from_json(path)
 
 def iter_all_chunks(paths: Iterable[str]) -> Iterable[Dict[str, Any]]:
     for p in paths:
-        for c in load_chunks_from_json(p):
-            yield c
+        yield from iter_chunks_from_json(p)
 
+@lru_cache(maxsize=256)
 def encode_query(query_text: str) -> Dict[str, Any]:
     """
     Encodes a single query string into dense and sparse vectors.
+    Cached per query text: the router can retrieve for the same query several times.
+    The returned dict is shared between callers and must not be mutated.
     """
     _load_dense()
     _load_splade()
@@ -113,6 +145,27 @@ def query_hybrid(
         print(f"Error querying Pinecone: {e}")
         return {"matches": []}
 
+_SKIP_META_KEYS = frozenset({"chunk_text", "text", "values", "sparse_values", "id", "metadata_extras"})
+
+def _dumps(v) -> str:
+    # orjson instead of json.dumps: nested lists/dicts (references, referenced_in, ...) are serialised per chunk
+    return orjson.dumps(v, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def _serialize_list(v: list):
+    if all(isinstance(x, (str, int, float)) for x in v):
+        return [str(x) for x in v]
+    return _dumps(v)
+
+def _keep(v):
+    return v
+
+# Metadata serializer per JSON value type; types not listed here (e.g. None) are dropped
+_META_SERIALIZERS = {
+    str: _keep, int: _keep, float: _keep, bool: _keep,
+    list: _serialize_list,
+    dict: _dumps,
+}
+
 def _flatten_and_serialize_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
     """
     Prepares chunk data for Pinecone metadata strict rules:
@@ -135,25 +188,11 @@ def _flatten_and_serialize_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
     
     # Helper to process a single key-value pair
     def process_field(k, v):
-        if k in ["chunk_text", "text", "values", "sparse_values", "id", "metadata_extras"]: 
+        if k in _SKIP_META_KEYS: 
             return 
-        if v is None:
-            return
-
-        if isinstance(v, list):
-           
-            if all(isinstance(x, (str, int, float)) for x in v):
-                
-                meta[k] = [str(x) for x in v]
-            else:
-                meta[k] = json.dumps(v)
-        
-        elif isinstance(v, (str, int, float, bool)):
-            meta[k] = v
-        
-        elif isinstance(v, dict):
-           
-            meta[k] = json.dumps(v)
+        serialize = _META_SERIALIZERS.get(type(v))
+        if serialize is not None:
+            meta[k] = serialize(v)
 
     for k, v in chunk.items():
         process_field(k, v)
@@ -164,6 +203,18 @@ def _flatten_and_serialize_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
             
     return meta
 
+def _upsert_with_retry(vectors: List[Dict[str, Any]], namespace: str) -> None:
+    for attempt in range(3):
+        try:
+            _index.upsert(vectors=vectors, namespace=namespace)
+            return
+        except Exception as e:
+            print(f"\n[!] Network glitch on attempt {attempt+1}: {e}")
+            if attempt < 2:
+                time.sleep(15)
+            else:
+                raise e
+
 def build_hybrid_index(chunk_files: List[str], *, namespace: str, resume_at: int = 0, batch_size: int = BATCH_SIZE) -> None:
     """
     Upserts chunks to Pinecone with correct metadata formatting.
@@ -171,56 +222,51 @@ def build_hybrid_index(chunk_files: List[str], *, namespace: str, resume_at: int
     connect_to_index()
     
     batch_texts, batch_ids, batch_meta = [], [], []
+    # Upserts run on a background thread while the next batch is encoded; at most
+    # one finished batch waits behind the one uploading, so memory stays bounded.
+    pending = deque()
 
-    def _flush_with_retry():
+    def _flush():
         if not batch_ids: return
         
-        for attempt in range(3):
-            try:
-                dense_vecs = _encode_dense_batch(batch_texts)
-                sparse_vecs = _encode_sparse_batch(batch_texts)
-
-                vectors = []
-                for i in range(len(batch_ids)):
-                    vectors.append({
-                        "id": batch_ids[i],
-                        "values": dense_vecs[i],
-                        "sparse_values": sparse_vecs[i],
-                        "metadata": batch_meta[i],
-                    })
-                
-                _index.upsert(vectors=vectors, namespace=namespace)
-                return 
-                
-            except Exception as e:
-                print(f"\n[!] Network glitch on attempt {attempt+1}: {e}")
-                if attempt < 2:
-                    time.sleep(15)
-                else:
-                    raise e 
-
-        batch_ids.clear(); batch_texts.clear(); batch_meta.clear()
+        dense_vecs = _encode_dense_batch(batch_texts)
+        sparse_vecs = _encode_sparse_batch(batch_texts)
+
+        vectors = [
+            {"id": i, "values": d, "sparse_values": sp, "metadata": m}
+            for i, d, sp, m in zip(batch_ids, dense_vecs, sparse_vecs, batch_meta)
+        ]
+        
+        pending.append(uploader.submit(_upsert_with_retry, vectors, namespace))
+        if len(pending) > 1:
+            pending.popleft().result()
 
     print(f"Processing {len(chunk_files)} file(s) for '{namespace}'.")
     
-    total_processed = 0
-    for chunk in tqdm(iter_all_chunks(chunk_files), desc=f"Indexing {namespace}"):
-        total_processed += 1
-        if total_processed < resume_at: continue 
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        total_processed = 0
+        # Redraw at most once a second / once per batch rather than on every chunk
+        progress = tqdm(iter_all_chunks(chunk_files), desc=f"Indexing {namespace}",
+                        miniters=batch_size, mininterval=1.0, smoothing=0, unit_scale=True)
+        for chunk in progress:
+            total_processed += 1
+            if total_processed < resume_at: continue 
 
-        chunk_id = chunk.get("chunk_id")
-        text = chunk.get("chunk_text", "")
-        
-        safe_meta = _flatten_and_serialize_metadata(chunk)
+            chunk_id = chunk.get("chunk_id")
+            text = chunk.get("chunk_text", "")
+            
+            safe_meta = _flatten_and_serialize_metadata(chunk)
+            
+            if chunk_id and text:
+                batch_ids.append(chunk_id)
+                batch_texts.append(text)
+                batch_meta.append(safe_meta)
+
+            if len(batch_ids) >= batch_size:
+                _flush()
+                batch_ids.clear(); batch_texts.clear(); batch_meta.clear()
         
-        if chunk_id and text:
-            batch_ids.append(chunk_id)
-            batch_texts.append(text)
-            batch_meta.append(safe_meta)
-
-        if len(batch_ids) >= batch_size:
-            _flush_with_retry()
-            batch_ids.clear(); batch_texts.clear(); batch_meta.clear()
-    
-    _flush_with_retry()
+        _flush()
+        while pending:
+            pending.popleft().result()
     print(f"Done with {namespace}.")
\ No newline at end of file
@@ -1,17 +1,24 @@
 import os
+import logging
+import io
+import re
 import json
 import requests
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, TypedDict
 from pathlib import Path
+from lxml import etree
 
 
 from chunking_scripts.chunk_filings import process_single_file as process_filings
 from chunking_scripts.chunk_textbook import process_single_file as process_textbook
-from index import build_hybrid_index 
 
 from state import AgentState 
 
+logger = logging.getLogger(__name__)
+
 # The folder where we physically store the uploaded PDF
 UPLOAD_DIR = os.path.join("data", "user_uploads")
 
@@ -21,6 +28,8 @@ JSON_DIR = os.path.join("data", "processing", "json")
 
 # Grobid URL (Assumed running locally via Docker)
 GROBID_URL = "http://localhost:8070/api/processFulltextDocument"
+# Parallel Grobid requests for a batch upload (Grobid's own default concurrency is 10)
+GROBID_CONCURRENCY = int(os.getenv("GROBID_CONCURRENCY", "10"))
 
 # Define Input Type for the Node
 class IngestInput(TypedDict):
@@ -34,44 +43,104 @@ def _ensure_directories():
     os.makedirs(XML_DIR, exist_ok=True)
     os.makedirs(JSON_DIR, exist_ok=True)
 
-def _call_grobid(file_path: str) -> str:
-    """Sends PDF to Grobid and returns the XML string."""
+def _store_upload(src: str, dst: str) -> None:
+    """
+    Puts the uploaded PDF into storage. A hard link shares the file's data without
+    copying it; if that isn't possible (different filesystem, name already taken),
+    fall back to a regular copy, which uses sendfile/copy_file_range where available.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def _call_grobid(file_path: str) -> bytes:
+    """Sends PDF to Grobid and returns the raw XML bytes."""
     print(f"--- Calling Grobid for: {os.path.basename(file_path)} ---")
     
-    files = {
-        'input': (
-            os.path.basename(file_path), 
-            open(file_path, 'rb'), 
-            'application/pdf', 
-            {'Expires': '0'}
-        )
-    }
-    
     try:
-        response = requests.post(GROBID_URL, files=files, timeout=300)
+        # MultipartEncoder streams the PDF from disk instead of building the whole body in memory
+        with open(file_path, 'rb') as pdf:
+            encoder = MultipartEncoder(fields={
+                'input': (
+                    os.path.basename(file_path), 
+                    pdf, 
+                    'application/pdf', 
+                    {'Expires': '0'}
+                )
+            })
+            response = requests.post(GROBID_URL, data=encoder, headers={'Content-Type': encoder.content_type}, timeout=300)
         if response.status_code == 200:
-            return response.text
+            return response.content
         else:
             raise Exception(f"Grobid Error {response.status_code}: {response.text}")
     except requests.exceptions.ConnectionError:
         raise Exception("Could not connect to Grobid at localhost:8070. Is the Docker container running?")
 
-def _decide_chunker(xml_content: str) -> str:
+# Heuristics for SEC Filings, compiled into one case-insensitive alternation
+_FILING_MARKERS = ("form 10-k", "form 10-q", "united states securities and exchange commission")
+_FILING_MARKERS_RE = re.compile("|".join(map(re.escape, _FILING_MARKERS)), re.IGNORECASE)
+
+def _decide_chunker(xml_content: bytes) -> str:
     """
     Scans XML to decide if it's a Filing (10-K/Q) or General/Textbook.
+    Streams the document and stops at the first filing marker instead of
+    lower-casing a full copy of it.
     Returns: 'filings' or 'textbook'
     """
-    lower_xml = xml_content.lower()
-    
-    # Heuristics for SEC Filings
-    if "form 10-k" in lower_xml or "form 10-q" in lower_xml:
-        return "filings"
-    if "united states securities and exchange commission" in lower_xml:
-        return "filings"
+    for _, el in etree.iterparse(io.BytesIO(xml_content), events=("end",), recover=True):
+        # At an element's end its own text and its children's tails are complete
+        for text in (el.text, *(child.tail for child in el)):
+            if text and _FILING_MARKERS_RE.search(text):
+                return "filings"
+        el.clear(keep_tail=True)
         
     return "textbook"
 
 
+def _process_user_pdf(original_path: str) -> str:
+    """
+    Copies one uploaded PDF into storage, converts it with Grobid and chunks it.
+    Returns the path of the chunk JSON file.
+    """
+    filename = os.path.basename(original_path)
+    base_name = filename.replace(".pdf", "")
+    
+    # Move/Copy File to Persistent 'data/user_uploads'
+    # We copy it there to keep a history and ensure safe access
+    permanent_pdf_path = os.path.join(UPLOAD_DIR, filename)
+    try:
+        _store_upload(original_path, permanent_pdf_path)
+    except Exception as e:
+        print(f"Warning: Could not copy file to storage: {e}. Using original path.")
+        permanent_pdf_path = original_path
+
+    # GROBID Processing
+    xml_content = _call_grobid(permanent_pdf_path)
+    
+    # Save XML to hardcoded XML_DIR
+    xml_file_path = os.path.join(XML_DIR, f"{base_name}.xml")
+    with open(xml_file_path, "wb") as f:
+        f.write(xml_content)
+
+    # Classification & Chunking
+    strategy = _decide_chunker(xml_content)
+    print(f"--- Strategy Detected for {filename}: {strategy.upper()} ---")
+    
+    # The chunkers take: (input_xml_path, output_json_dir)
+    if strategy == "filings":
+        process_filings(xml_file_path, JSON_DIR)
+    else:
+        process_textbook(xml_file_path, JSON_DIR)
+
+    # The chunkers name their output after the whole input file: <name>.xml.json
+    expected_json_path = os.path.join(JSON_DIR, f"{os.path.basename(xml_file_path)}.json")
+    
+    if not os.path.exists(expected_json_path):
+        raise Exception(f"Chunker completed but output file not found: {expected_json_path}")
+    return expected_json_path
+
+
 def ingest_user_file(state: AgentState) -> Dict[str, Any]:
     """
     Orchestrates the full pipeline:
@@ -83,9 +152,10 @@ def ingest_user_file(state: AgentState) -> Dict[str, Any]:
     """
     print("--- NODE: Ingest User File ---")
     
-    # 1. Validation
+    # 1. Validation (a single file dict, or a list of them for a batch upload)
     file_info = state.get("user_file_info")
-    if not file_info or "path" not in file_info:
+    file_infos = file_info if isinstance(file_info, list) else [file_info]
+    if not file_info or any(not info or "path" not in info for info in file_infos):
         error_msg = "No file path provided in state['user_file_info']."
         print(f"Error: {error_msg}")
         return {
@@ -93,54 +163,27 @@ def ingest_user_file(state: AgentState) -> Dict[str, Any]:
             "chat_history": [("ai", f"System Error: {error_msg}")]
         }
 
-    original_path = file_info["path"]
-    filename = os.path.basename(original_path)
-    base_name = filename.replace(".pdf", "")
+    original_paths = [info["path"] for info in file_infos]
+    filenames = ", ".join(os.path.basename(p) for p in original_paths)
     
     # 2. Setup Directories
     _ensure_directories()
-    
-    # 3. Move/Copy File to Persistent 'data/user_uploads'
-    # We copy it there to keep a history and ensure safe access
-    permanent_pdf_path = os.path.join(UPLOAD_DIR, filename)
-    try:
-        shutil.copy2(original_path, permanent_pdf_path)
-    except Exception as e:
-        print(f"Warning: Could not copy file to storage: {e}. Using original path.")
-        permanent_pdf_path = original_path
 
     try:
-        # 4. GROBID Processing
-        xml_content = _call_grobid(permanent_pdf_path)
-        
-        # Save XML to hardcoded XML_DIR
-        xml_file_path = os.path.join(XML_DIR, f"{base_name}.xml")
-        with open(xml_file_path, "w", encoding="utf-8") as f:
-            f.write(xml_content)
-
-        # 5. Classification & Chunking
-        strategy = _decide_chunker(xml_content)
-        print(f"--- Strategy Detected: {strategy.upper()} ---")
-        
-        # The chunkers take: (input_xml_path, output_json_dir)
-        if strategy == "filings":
-            process_filings(xml_file_path, JSON_DIR)
-        else:
-            process_textbook(xml_file_path, JSON_DIR)
-
-        # 6. Indexing (Upsert to Pinecone)
-        # Expected JSON path created by the chunker
-        expected_json_path = os.path.join(JSON_DIR, f"{base_name}.json")
-        
-        if not os.path.exists(expected_json_path):
-            raise Exception(f"Chunker completed but output file not found: {expected_json_path}")
+        # 3-5. Each file goes through Grobid and its chunker independently. The work is
+        # mostly waiting on Grobid, so files run in parallel up to its concurrency.
+        with ThreadPoolExecutor(max_workers=min(GROBID_CONCURRENCY, len(original_paths))) as executor:
+            json_paths = list(executor.map(_process_user_pdf, original_paths))
             
+        # 6. Indexing (Upsert to Pinecone)
         print(f"--- Upserting to Namespace: 'user' ---")
         
-        # Call the corrected build_hybrid_index from index.py
+        # Call the corrected build_hybrid_index from index.py (imported here: it loads torch
+        # and the encoders, which only ingestion and retrieval need)
         # It takes a LIST of file paths
+        from index import build_hybrid_index
         build_hybrid_index(
-            chunk_files=[expected_json_path], 
+            chunk_files=json_paths, 
             namespace="user"
         )
         
@@ -151,15 +194,14 @@ def ingest_user_file(state: AgentState) -> Dict[str, Any]:
         return {
             "search_namespaces": ["user"], 
             "chat_history": [
-                ("system", f"User file '{filename}' has been indexed. Switch to 'user' namespace mode. Answer based ONLY on this file.")
+                ("system", f"User file '{filenames}' has been indexed. Switch to 'user' namespace mode. Answer based ONLY on this file.")
             ],
             "next_step": "router"
         }
 
     except Exception as e:
         print(f"!!! INGESTION FAILED: {e} !!!")
-        import traceback
-        traceback.print_exc()
+        logger.exception("ingestion failed")
         
         return {
             "tool_error_count": 1,
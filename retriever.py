@@ -1,43 +1,68 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 import os
-import concurrent.futures
+import logging
 import sys
+import hashlib
+import heapq
+from collections import OrderedDict
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from pinecone import Pinecone
-from sentence_transformers import CrossEncoder
+from state import AgentState
 
-from index import encode_query 
+logger = logging.getLogger(__name__)
 
-from state import AgentState
+# torch, sentence_transformers, pinecone and index (which loads the encoders) are imported
+# on first use, so nodes that never retrieve don't pay their import time
+if TYPE_CHECKING:
+    from pinecone import Pinecone
+    from sentence_transformers import CrossEncoder
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "financebot")
 RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "BAAI/bge-reranker-large")
 RERANKER_MAX_LENGTH = 512
+RERANKER_BATCH_SIZE = 32
+# CPU only: dynamically quantize the reranker's Linear layers to int8 (opt-in, scores shift slightly)
+RERANKER_CPU_INT8 = os.getenv("RERANKER_CPU_INT8", "0") == "1"
+RERANK_CACHE_SIZE = 10_000
 
 ALL_NAMESPACES = ["filings", "transcripts", "textbook", "glossary"]
+# Upper bound on chunks carried in state (and so on the synthesizer's prompt)
+MAX_RETRIEVED_CHUNKS = 20
 
 _pc: Optional[Pinecone] = None
 _index = None
 _reranker: Optional[CrossEncoder] = None
+# (query digest, chunk id) -> reranker score; oldest entries are evicted first
+_rerank_cache: "OrderedDict[tuple, float]" = OrderedDict()
 
 def _ensure_clients():
     global _pc, _index
     if _pc is None:
-        if not PINECONE_API_KEY: raise EnvironmentError("PINECONE_API_KEY not set")
-        _pc = Pinecone(api_key=PINECONE_API_KEY)
+        # Re-read at call time: importing index (and its load_dotenv) no longer precedes this module
+        api_key = PINECONE_API_KEY or os.getenv("PINECONE_API_KEY")
+        if not api_key: raise EnvironmentError("PINECONE_API_KEY not set")
+        from pinecone import Pinecone
+        _pc = Pinecone(api_key=api_key)
     if _index is None:
-        _index = _pc.Index(PINECONE_INDEX_NAME)
+        # The client's own pool runs the per-namespace queries in parallel (+1 for 'user')
+        _index = _pc.Index(PINECONE_INDEX_NAME, pool_threads=len(ALL_NAMESPACES) + 1)
 
 def _ensure_models():
     global _reranker
     if _reranker is None:
         print(f"Loading Reranker: {RERANKER_MODEL_NAME}")
-        _reranker = CrossEncoder(RERANKER_MODEL_NAME, max_length=RERANKER_MAX_LENGTH)
+        import torch
+        from sentence_transformers import CrossEncoder
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        _reranker = CrossEncoder(RERANKER_MODEL_NAME, max_length=RERANKER_MAX_LENGTH, device=device)
+        if device == "cuda":
+            _reranker.model.half()
+        elif RERANKER_CPU_INT8:
+            _reranker.model = torch.ao.quantization.quantize_dynamic(_reranker.model, {torch.nn.Linear}, dtype=torch.qint8)
 
 @dataclass
 class Candidate:
@@ -48,22 +73,32 @@ class Candidate:
     origin_namespace: str
 
 
-def _search_single_namespace(
+def _start_namespace_search(
     namespace: str, 
     dense_vec: List[float], 
     sparse_vec: Dict[str, Any], 
     top_k: int,
     filters: Optional[Dict[str, Any]] = None 
-) -> List[Candidate]:
+):
+    """Sends the query without waiting (async_req); returns the pending result, or None on failure."""
     try:
-        res = _index.query(
+        return _index.query(
             vector=dense_vec,
             # sparse_vector=sparse_vec, # comment because my vector database does not support hybrid search 
             top_k=top_k, 
             include_metadata=True, 
             namespace=namespace,
-            filter=filters 
+            filter=filters,
+            async_req=True
         )
+    except Exception as e:
+        print(f"Warning: Failed to search namespace '{namespace}': {e}")
+        return None
+
+def _collect_namespace_results(namespace: str, pending) -> List[Candidate]:
+    if pending is None: return []
+    try:
+        res = pending.get()
         candidates = []
         for m in (res.matches or []):
             md = m.metadata or {}
@@ -75,23 +110,86 @@ def _search_single_namespace(
         print(f"Warning: Failed to search namespace '{namespace}': {e}")
         return []
 
+def _score_pairs(query: str, texts: List[str]) -> List[float]:
+    """
+    Cross-encoder scores for (query, text) pairs. The tokenizer truncates the passage
+    (never the query) at the model's token limit, so no character pre-slicing is needed.
+    """
+    import torch
+    model, tokenizer = _reranker.model, _reranker.tokenizer
+    activation = getattr(_reranker, "activation_fn", None)
+    
+    # Tokenize every pair in one call, then pad batch by batch in length order so
+    # each batch only pads to its own longest pair
+    encoded = tokenizer([query] * len(texts), texts, truncation="only_second", max_length=RERANKER_MAX_LENGTH)
+    order = sorted(range(len(texts)), key=lambda j: len(encoded["input_ids"][j]))
+    
+    scores = [0.0] * len(texts)
+    with torch.inference_mode():
+        for i in range(0, len(order), RERANKER_BATCH_SIZE):
+            idx = order[i:i + RERANKER_BATCH_SIZE]
+            features = tokenizer.pad(
+                {key: [values[j] for j in idx] for key, values in encoded.items()}, return_tensors="pt"
+            ).to(model.device)
+            logits = model(**features).logits[:, 0]
+            if activation is not None:
+                logits = activation(logits)
+            for j, score in zip(idx, logits.float().cpu().tolist()):
+                scores[j] = score
+    return scores
+
 def _rerank_candidates(query: str, candidates: List[Candidate], top_k: int) -> List[Candidate]:
     _ensure_models()
     if not candidates: return []
     
-    unique_candidates = {c.id: c for c in candidates}.values()
-    candidates = list(unique_candidates)
+    # Dedupe by id before scoring (keeping the best-matching copy) so no pair is reranked twice
+    best: Dict[str, Candidate] = {}
+    for c in candidates:
+        prev = best.get(c.id)
+        if prev is None or c.score > prev.score:
+            best[c.id] = c
+    candidates = list(best.values())
     
-    pairs = [(query, c.text[:4000]) for c in candidates]
-    scores = _reranker.predict(pairs, convert_to_numpy=True, show_progress_bar=False)
+    # Later retrieval loops for the same query mostly see the same chunks; only score the new ones
+    qh = hashlib.blake2b(query.encode("utf-8"), digest_size=8).digest()
+    misses = []
+    for c in candidates:
+        key = (qh, c.id)
+        cached = _rerank_cache.get(key)
+        if cached is None:
+            misses.append(c)
+        else:
+            # Refresh recency so pairs the router keeps revisiting aren't evicted first
+            _rerank_cache.move_to_end(key)
+            c.score = cached
     
-    for c, s in zip(candidates, scores):
-        c.score = float(s)
+    if misses:
+        scores = _score_pairs(query, [c.text for c in misses])
+        
+        for c, s in zip(misses, scores):
+            c.score = s
+            _rerank_cache[(qh, c.id)] = c.score
+        while len(_rerank_cache) > RERANK_CACHE_SIZE:
+            _rerank_cache.popitem(last=False)
     
     candidates.sort(key=lambda x: x.score, reverse=True)
     return candidates[:top_k]
 
 
+def merge_chunks(prev_chunks: List[Dict[str, Any]], new_chunks: List[Dict[str, Any]], limit: int = MAX_RETRIEVED_CHUNKS) -> List[Dict[str, Any]]:
+    """
+    Merges new results into the state's chunks by id (the new copy wins) and keeps the `limit`
+    highest reranker scores, returned in first-seen order.
+    """
+    unique_chunks = {c["id"]: c for c in prev_chunks}
+    unique_chunks.update({c["id"]: c for c in new_chunks})
+    merged = list(unique_chunks.values())
+    if len(merged) > limit:
+        top = heapq.nlargest(limit, range(len(merged)), key=lambda i: merged[i].get("score", 0.0))
+        merged = [merged[i] for i in sorted(top)]
+    return merged
+
+
 def retrieve(state: AgentState) -> Dict[str, Any]:
     """
     Retrieves chunks based on the query, 'search_namespaces', and 'retrieval_filters'.
@@ -105,8 +203,8 @@ def retrieve(state: AgentState) -> Dict[str, Any]:
         print("Warning: No namespaces in state. Defaulting to ALL.")
         target_namespaces = ALL_NAMESPACES
     
-    # Remove duplicates just in case
-    target_namespaces = list(set(target_namespaces))
+    # Remove duplicates just in case (keeping the requested order)
+    target_namespaces = list(dict.fromkeys(target_namespaces))
     
     filters = state.get("retrieval_filters")
     
@@ -116,20 +214,19 @@ def retrieve(state: AgentState) -> Dict[str, Any]:
 
     try:
         _ensure_clients()
+        from index import encode_query
         qvecs = encode_query(query)
         
         # 3. Parallel Search
         all_candidates = []
         k_per_ns = 15 
         
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = {
-                
-                executor.submit(_search_single_namespace, ns, qvecs["dense"], qvecs["sparse"], k_per_ns, filters): ns
-                for ns in target_namespaces
-            }
-            for future in concurrent.futures.as_completed(futures):
-                all_candidates.extend(future.result())
+        pending = [
+            (ns, _start_namespace_search(ns, qvecs["dense"], qvecs["sparse"], k_per_ns, filters))
+            for ns in target_namespaces
+        ]
+        for ns, result in pending:
+            all_candidates.extend(_collect_namespace_results(ns, result))
 
         if not all_candidates:
             print("   No candidates found.")
@@ -151,17 +248,12 @@ def retrieve(state: AgentState) -> Dict[str, Any]:
 
         prev_chunks = state.get("retrieved_chunks", [])
         
-        unique_chunks = {c["id"]: c for c in prev_chunks}
-        for chunk in new_chunks:
-            unique_chunks[chunk["id"]] = chunk
-            
-        final_combined_chunks = list(unique_chunks.values())
+        final_combined_chunks = merge_chunks(prev_chunks, new_chunks)
             
         print(f"--- RETRIEVER: Success. Found {len(new_chunks)} new. Total in state: {len(final_combined_chunks)}. ---")
         return {"retrieved_chunks": final_combined_chunks}
 
     except Exception as e:
         print(f"!!! RETRIEVER ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("retrieval failed")
         return {"retrieved_chunks": []}
\ No newline at end of file
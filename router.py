@@ -34,6 +34,9 @@ class RouteChoice(BaseModel):
         default=["filings", "transcripts", "textbook", "glossary"]
     )
 
+# Bound once: with_structured_output rebuilds the tool schema for RouteChoice on every call
+_STRUCTURED_LLM = _llm.with_structured_output(RouteChoice)
+
 BASE_SYSTEM_PROMPT = """
 You are a specialized Financial Analysis Agent.
 Your goal is to answer financial queries using your tools and knowledge base.
@@ -74,24 +77,23 @@ def _format_state_for_llm(state: AgentState) -> str:
     
     # 2. Context Check (THE FIX: Show Snippets)
     chunks = state.get("retrieved_chunks", [])
-    chunks_preview = ""
     if chunks:
-        chunks_preview = "--- RETRIEVED CONTENT PREVIEW (First 5) ---\n"
+        preview_parts = ["--- RETRIEVED CONTENT PREVIEW (First 5) ---\n"]
         for i, c in enumerate(chunks[:5]): 
             # Slice first 150 chars to give the Router a "peek"
             content = c.page_content if hasattr(c, 'page_content') else str(c)
-            snippet = content[:150].replace("\n", " ") 
-            chunks_preview += f"[{i+1}] ...{snippet}...\n"
+            snippet = content[:150].replace("\n", " ")
+            preview_parts.append(f"[{i+1}] ...{snippet}...\n")
         if len(chunks) > 5:
-            chunks_preview += f"... (+{len(chunks)-5} more items)\n"
+            preview_parts.append(f"... (+{len(chunks)-5} more items)\n")
+        chunks_preview = "".join(preview_parts)
     else:
         chunks_preview = "Retrieved Content: None (Empty).\n"
     
     # 3. Tool Logs
     tool_outputs = state.get("tool_outputs", []) or []
-    tools_log = ""
     if tool_outputs:
-        tools_log = "--- TOOL EXECUTION LOG ---\n"
+        log_parts = ["--- TOOL EXECUTION LOG ---\n"]
         for i, output in enumerate(tool_outputs, 1):
             t_name = output.get("tool_name", "Unknown")
             t_result = output.get("result", output)
@@ -105,7 +107,8 @@ def _format_state_for_llm(state: AgentState) -> str:
                 if len(res_str) > 300: res_str = res_str[:300] + "..."
                 log_entry += f" -> Success: {res_str}"
             
-            tools_log += log_entry + "\n"
+            log_parts.append(log_entry + "\n")
+        tools_log = "".join(log_parts)
     else:
         tools_log = "Tool Outputs: None.\n"
 
@@ -136,7 +139,7 @@ def router(state: AgentState) -> Dict[str, Any]:
         }
 
     # 2. Call LLM
-    structured_llm = _llm.with_structured_output(RouteChoice)
+    structured_llm = _STRUCTURED_LLM
     messages = [
         SystemMessage(content=BASE_SYSTEM_PROMPT),
         HumanMessage(content=_format_state_for_llm(state))
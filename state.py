@@ -1,5 +1,13 @@
 import operator
-from typing import Annotated, List, Dict, Any, Optional, Tuple, TypedDict
+from dataclasses import dataclass
+from typing import Annotated, List, Dict, Any, Optional, Tuple, TypedDict, Union
+
+@dataclass(slots=True, frozen=True)
+class PlannedCall:
+    """One tool call handed from the tool_planner to the tool_executor; tool_id is None for unknown tools."""
+    tool_name: str
+    tool_id: Optional[int]
+    args: Dict[str, Any]
 
 class AgentState(TypedDict):
     """
@@ -18,11 +26,12 @@ class AgentState(TypedDict):
     retrieval_filters: Optional[Dict[str, Any]] 
     
     # --- Tool Management ---
-    tool_calls: List[Dict[str, Any]]   
+    tool_calls: List[PlannedCall]   
     tool_outputs: Annotated[List[Dict[str, Any]], operator.add]
     
     # --- User-Uploaded File Management ---
-    user_file_info: Optional[Dict[str, Any]] 
+    # One file dict, or a list of them for a batch upload (ingest_user_file handles both)
+    user_file_info: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]
     
     # --- Interaction Management ---
     clarification_question: Optional[str] 
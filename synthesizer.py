@@ -55,17 +55,13 @@ def _clean_tool_output(output: Dict[str, Any]) -> str:
     status = output.get("status", "unknown")
     
     # 2. Format the Output
-    formatted_out = f"   * Action: Ran '{tool_name}' with input: {inputs}\n"
+    action = f"   * Action: Ran '{tool_name}' with input: {inputs}\n"
+    result_str = str(result)
     
-    if status == "error" or "error" in str(result).lower():
-        formatted_out += f"   * STATUS: FAILED\n"
-        formatted_out += f"   * Error Details: {result}\n"
-    else:
-        # If result is simple, show it. If complex, the LLM parses the string rep.
-        formatted_out += f"   * STATUS: SUCCESS\n"
-        formatted_out += f"   * Result: {result}\n"
-        
-    return formatted_out
+    if status == "error" or "error" in result_str.lower():
+        return f"{action}   * STATUS: FAILED\n   * Error Details: {result_str}\n"
+    # If result is simple, show it. If complex, the LLM parses the string rep.
+    return f"{action}   * STATUS: SUCCESS\n   * Result: {result_str}\n"
 
 def _clean_chunk(chunk: Dict[str, Any], index: int) -> str:
     """
@@ -104,21 +100,24 @@ def _format_state_for_synthesis(state: AgentState) -> str:
     # 3. Format Tool Outputs
     tool_outputs = state.get("tool_outputs", [])
     if tool_outputs:
-        tools_block = "--- TOOL & CALCULATION RESULTS (Trust these numbers) ---\n"
-        for i, out in enumerate(tool_outputs, 1):
-            tools_block += f"[Result {i}]\n"
-            tools_block += _clean_tool_output(out)
-            tools_block += "--------------------------------------------------------\n"
+        tool_parts = ["--- TOOL & CALCULATION RESULTS (Trust these numbers) ---\n"]
+        tool_parts.extend(
+            f"[Result {i}]\n{_clean_tool_output(out)}--------------------------------------------------------\n"
+            for i, out in enumerate(tool_outputs, 1)
+        )
+        tools_block = "".join(tool_parts)
     else:
         tools_block = "--- TOOL RESULTS ---\n(No calculations were performed.)\n\n"
 
     # 4. Format Retrieved Chunks 
     chunks = state.get("retrieved_chunks", [])
     if chunks:
-        chunks_block = "--- RETRIEVED TEXT DOCUMENTS (Cite these sources) ---\n"
-        for i, chunk in enumerate(chunks, 1):
-            chunks_block += _clean_chunk(chunk, i)
-            chunks_block += "-----------------------------------------------------\n"
+        chunk_parts = ["--- RETRIEVED TEXT DOCUMENTS (Cite these sources) ---\n"]
+        chunk_parts.extend(
+            f"{_clean_chunk(chunk, i)}-----------------------------------------------------\n"
+            for i, chunk in enumerate(chunks, 1)
+        )
+        chunks_block = "".join(chunk_parts)
     else:
         chunks_block = "--- RETRIEVED TEXT ---\n(No documents were found.)\n\n"
 
@@ -0,0 +1,36 @@
+import os
+import sys
+import types
+
+import ingest_user_file as ingest
+
+TEI = b"<TEI><text><body><p>Chapter 1. Time value of money.</p></body></text></TEI>"
+
+
+def _fake_chunker(input_path, output_dir):
+    # Same output naming as chunk_textbook/chunk_filings.process_single_file
+    with open(os.path.join(output_dir, f"{os.path.basename(input_path)}.json"), "w") as f:
+        f.write("[]")
+
+
+def test_batch_upload_indexes_every_file(tmp_path, monkeypatch):
+    for name, sub in (("UPLOAD_DIR", "uploads"), ("XML_DIR", "xml"), ("JSON_DIR", "json")):
+        monkeypatch.setattr(ingest, name, str(tmp_path / sub))
+    monkeypatch.setattr(ingest, "_call_grobid", lambda path: TEI)
+    monkeypatch.setattr(ingest, "process_textbook", _fake_chunker)
+    indexed = {}
+    fake_index = types.ModuleType("index")
+    fake_index.build_hybrid_index = lambda chunk_files, namespace: indexed.update(files=chunk_files, namespace=namespace)
+    monkeypatch.setitem(sys.modules, "index", fake_index)
+
+    pdfs = []
+    for name in ("a.pdf", "b.pdf"):
+        path = tmp_path / name
+        path.write_bytes(b"%PDF-1.4")
+        pdfs.append({"path": str(path), "name": name})
+
+    out = ingest.ingest_user_file({"user_file_info": pdfs})
+
+    assert out["search_namespaces"] == ["user"]
+    assert indexed["namespace"] == "user"
+    assert [os.path.basename(p) for p in indexed["files"]] == ["a.xml.json", "b.xml.json"]
@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+
+from agent_tools import tool_pandas
+from agent_tools.tool_pandas import PandasToolInput, read_csv_with_fallback
+
+RAGGED_CSV = "metric,2023,2024\nRevenue,100,120\nNote\nNet income,10,12\n"
+
+
+def _expected(**kwargs) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(RAGGED_CSV), **kwargs)
+
+
+def test_ragged_text_matches_pandas():
+    pd.testing.assert_frame_equal(read_csv_with_fallback(text=RAGGED_CSV), _expected())
+
+
+def test_ragged_file_as_strings(tmp_path):
+    path = tmp_path / "table.csv"
+    path.write_text(RAGGED_CSV)
+    df = read_csv_with_fallback(path=str(path), dtype=str)
+    pd.testing.assert_frame_equal(df, _expected(dtype=str))
+    assert df.loc[1, "metric"] == "Note" and pd.isna(df.loc[1, "2023"])
+
+
+def test_duplicate_headers_are_mangled():
+    df = read_csv_with_fallback(text="col,col\n1,2\n")
+    assert list(df.columns) == ["col", "col.1"]
+
+
+def test_dates_stay_text():
+    text = "date,value\n2024-01-31,1.5\n"
+    pd.testing.assert_frame_equal(read_csv_with_fallback(text=text), pd.read_csv(io.StringIO(text)))
+
+
+def test_result_cache_keys_on_path_and_returns_copies(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_pandas, "DATA_ROOT", str(tmp_path))
+    for name in ("a.csv", "b.csv"):
+        (tmp_path / name).write_text("x\n1\n")
+    ops = [{"action": "head", "n": 1}]
+
+    first = tool_pandas.pandas_tool(PandasToolInput(data_path="a.csv", operations=ops))
+    first["mutated"] = True
+    again = tool_pandas.pandas_tool(PandasToolInput(data_path="a.csv", operations=ops))
+    other = tool_pandas.pandas_tool(PandasToolInput(data_path="b.csv", operations=ops))
+
+    assert "mutated" not in again
+    assert other["meta"]["meta_in"]["source_name"] == "b.csv"
@@ -0,0 +1,28 @@
+import pytest
+
+from agent_tools.tool_valuation import AnyValuationInput, valuation_tool
+
+
+def test_raw_dict_matches_root_model():
+    args = {"operation": "npv", "cash_flows": [-100.0, 50.0, 60.0], "discount_rate": 0.10}
+    assert valuation_tool(args) == valuation_tool(AnyValuationInput.model_validate(args))
+
+
+def test_raw_dict_validation_error_is_structured():
+    out = valuation_tool({"operation": "npv", "cash_flows": "not a list"})
+    assert out["status"] == "validation_error"
+    assert out["operation"] == "npv"
+    assert {err["loc"][0] for err in out["errors"]} == {"cash_flows", "discount_rate"}
+
+
+def test_raw_dict_unknown_operation():
+    assert valuation_tool({"operation": "bogus"}) == {"error": "Unsupported operation: bogus"}
+
+
+def test_level_annuity_closed_form_matches_discounting():
+    from agent_tools.tool_valuation import _npv_from_series, _pv_series
+    assert _npv_from_series([5.0, 5.0, 5.0], 1e-12) == pytest.approx(_pv_series([5.0, 5.0, 5.0], 1e-12, False), rel=1e-12)
+    for rate in (1e-9, 0.05, 0.3):
+        for mid_year in (False, True):
+            expected = _pv_series([7.0] * 10, rate, mid_year)
+            assert _npv_from_series([7.0] * 10, rate, mid_year) == pytest.approx(expected, rel=1e-12)
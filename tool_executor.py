@@ -1,7 +1,11 @@
 import json
+import logging
 import pydantic
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Callable, Type, Tuple
-from state import AgentState 
+from state import AgentState, PlannedCall
+
+logger = logging.getLogger(__name__)
 
 
 from agent_tools.tool_calculator import calculator, CalculatorInput
@@ -9,18 +13,111 @@ from agent_tools.tool_GRC import growth_rate_calculator, GrowthRateInput
 from agent_tools.tool_ratio import ratio_calculator, RatioInput 
 from agent_tools.tool_valuation import valuation_tool, AnyValuationInput
 from agent_tools.tool_pandas import pandas_tool, PandasToolInput
-from agent_tools.table_qa_tool import table_qa_tool, TableQAInput
+from agent_tools.table_qa_tool import table_qa_tool, TableQAInput, table_qa_batch_tool, TableQABatchInput
 from agent_tools.data_fetching_tool import data_fetching_tool, AnyDataFetchingInput
 
-TOOL_MAP = {
-    "calculator": (calculator, CalculatorInput),
-    "growth_rate_calculator": (growth_rate_calculator, GrowthRateInput),
-    "ratio_calculator": (ratio_calculator, RatioInput), 
-    "valuation_tool": (valuation_tool, AnyValuationInput),
-    "pandas_tool": (pandas_tool, PandasToolInput),
-    "table_qa_tool": (table_qa_tool, TableQAInput),
-    "data_fetching_tool": (data_fetching_tool, AnyDataFetchingInput),
-}
+# Tools are addressed by position: tool_planner resolves a name to its id once via TOOL_ID,
+# and the executor indexes these parallel tuples. Each TypeAdapter is built once here.
+# The planner hands over raw dicts, so this is the only validation pass; even calculator keeps it
+# (its Literal operation, min_length and per-operation arity checks live in the schema).
+TOOL_NAMES = (
+    "calculator",
+    "growth_rate_calculator",
+    "ratio_calculator",
+    "valuation_tool",
+    "pandas_tool",
+    "table_qa_tool",
+    "table_qa_batch_tool",
+    "data_fetching_tool",
+)
+TOOL_ID = {name: i for i, name in enumerate(TOOL_NAMES)}
+_TOOL_FUNCS = (
+    calculator,
+    growth_rate_calculator,
+    ratio_calculator,
+    valuation_tool,
+    pandas_tool,
+    table_qa_tool,
+    table_qa_batch_tool,
+    data_fetching_tool,
+)
+_TOOL_ADAPTERS = tuple(pydantic.TypeAdapter(schema) for schema in (
+    CalculatorInput,
+    GrowthRateInput,
+    RatioInput,
+    AnyValuationInput,
+    PandasToolInput,
+    TableQAInput,
+    TableQABatchInput,
+    AnyDataFetchingInput,
+))
+
+_WRAPPER_KEYS = frozenset({"tool_input", "input", "arguments"})
+
+def _execute_one(tool_call: PlannedCall) -> Dict[str, Any]:
+    """Validates and runs a single planned tool call, returning its output record."""
+    logger.debug("Raw Tool Call: %s", tool_call)
+    
+    tool_name = tool_call.tool_name
+    tool_id = tool_call.tool_id
+    tool_args = tool_call.args
+    
+    if tool_id is None:
+        logger.warning("Unknown tool '%s'", tool_name)
+        return {"error": f"Unknown tool: {tool_name}", "tool_name": tool_name}
+    func_to_call = _TOOL_FUNCS[tool_id]
+    adapter = _TOOL_ADAPTERS[tool_id]
+    
+    try:
+        cleaned_args = tool_args
+        # The planner prompt forbids wrapper keys; this only repairs the occasional slip
+        if len(tool_args) == 1:
+            key = next(iter(tool_args))
+            val = tool_args[key]
+            if key in _WRAPPER_KEYS and isinstance(val, dict):
+                logger.debug("[Fix] Unwrapping '%s' layer", key)
+                cleaned_args = val
+        
+        logger.debug("Calling %s with: %s", tool_name, cleaned_args)
+
+        if not cleaned_args:
+            logger.warning("Planner produced empty arguments for %s", tool_name)
+            return {
+                "error": "Planner produced empty arguments for tool execution.",
+                "tool_name": tool_name,
+                "status": "invalid_tool_call"
+            }
+        validated_input = adapter.validate_python(cleaned_args)
+        raw_result = func_to_call(validated_input)
+        
+        return {
+            "tool_name": tool_name,
+            "input": cleaned_args,
+            "result": raw_result,
+            "status": "success"
+        }
+        
+    except pydantic.ValidationError as e:
+        # errors() skips pydantic's full human-readable rendering of str(e)
+        errors = e.errors(include_url=False, include_context=False)
+        summary = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in errors)
+        logger.warning("Validation Error for %s: %s", tool_name, summary)
+        return {
+            "error": f"Validation Error: {summary}",
+            "errors": errors,
+            "error_count": e.error_count(),
+            "tool_name": tool_name,
+            "input": tool_args,
+            "status": "validation_error"
+        }
+    except Exception as e:
+        logger.warning("Runtime Error in %s: %s", tool_name, e)
+        return {
+            "error": f"Runtime Error: {str(e)}",
+            "tool_name": tool_name,
+            "input": tool_args,
+            "status": "runtime_error"
+        }
 
 def tool_executor(state: AgentState) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -32,76 +129,16 @@ def tool_executor(state: AgentState) -> Dict[str, List[Dict[str, Any]]]:
     if not tool_calls:
         return {"tool_outputs": []}
         
-    print(f"--- TOOL EXECUTOR: Running {len(tool_calls)} tool(s) ---")
-    
-    tool_outputs = []
+    logger.info("TOOL EXECUTOR: Running %d tool(s)", len(tool_calls))
     
-    for tool_call in tool_calls:
-        
-        print(f"    Raw Tool Call: {tool_call}")
-        
-        tool_name = tool_call.get("tool_name") or tool_call.get("name")
-        
-        tool_args = tool_call.get("args") or tool_call.get("arguments") or {}
-        
-        if not tool_name:
-            print("!!! Error: Missing 'tool_name' in plan !!!")
-            continue
-            
-        if tool_name not in TOOL_MAP:
-            print(f"!!! Error: Unknown tool '{tool_name}' !!!")
-            tool_outputs.append({"error": f"Unknown tool: {tool_name}", "tool_name": tool_name})
-            continue
-        
-        func_to_call, input_schema = TOOL_MAP[tool_name]
-        
-        try:
-            cleaned_args = tool_args
-            if len(tool_args) == 1:
-                key = list(tool_args.keys())[0]
-                val = tool_args[key]
-                if key in ["tool_input", "input", "arguments"] and isinstance(val, dict):
-                    print(f"    [Fix] Unwrapping '{key}' layer...")
-                    cleaned_args = val
-            
-            print(f"    Calling {tool_name} with: {cleaned_args}")
+    # Most plans are a single call: run it inline, without spinning up a pool
+    if len(tool_calls) == 1:
+        return {"tool_outputs": [_execute_one(tool_calls[0])]}
 
-            if not cleaned_args:
-                print(f"!!! Error: Planner produced empty arguments for {tool_name} !!!")
-                tool_outputs.append({
-                    "error": "Planner produced empty arguments for tool execution.",
-                    "tool_name": tool_name,
-                    "status": "invalid_tool_call"
-                })
-                continue
-            validated_input = input_schema.model_validate(cleaned_args)
-            raw_result = func_to_call(validated_input)
-            
-            output = {
-                "tool_name": tool_name,
-                "input": cleaned_args,
-                "result": raw_result,
-                "status": "success"
-            }
-            
-        except pydantic.ValidationError as e:
-            print(f"!!! Validation Error for {tool_name}: {e} !!!")
-            output = {
-                "error": f"Validation Error: {str(e)}",
-                "tool_name": tool_name,
-                "input": tool_args,
-                "status": "validation_error"
-            }
-        except Exception as e:
-            print(f"!!! Runtime Error in {tool_name}: {e} !!!")
-            output = {
-                "error": f"Runtime Error: {str(e)}",
-                "tool_name": tool_name,
-                "input": tool_args,
-                "status": "runtime_error"
-            }
-            
-        tool_outputs.append(output)
+    # Planned calls are independent and mostly network/disk bound, so run them side by side;
+    # map() yields results in plan order
+    with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
+        tool_outputs = list(executor.map(_execute_one, tool_calls))
 
-    print(f"--- TOOL EXECUTOR: Finished all tools ---")
+    logger.info("TOOL EXECUTOR: Finished all tools")
     return {"tool_outputs": tool_outputs}
\ No newline at end of file
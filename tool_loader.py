@@ -1,18 +1,22 @@
 # tool_loader.py
+import types
 import typing
+from functools import lru_cache
 from typing import Type, get_args, get_origin, Union, Literal
 from pydantic import BaseModel, RootModel
 
 
+@lru_cache(maxsize=256)
 def _format_field_type(field_type) -> str:
     """Helper to convert Python types to readable strings."""
-    # Handle Optionals: Optional[float] 
-    if get_origin(field_type) is Union:
+    # Handle Unions: Optional[float] -> float?, Union[str, List[str]] -> str | List[str]
+    if get_origin(field_type) in (Union, types.UnionType):
         args = get_args(field_type)
-        if type(None) in args:
-            non_none = [a for a in args if a is not type(None)]
-            if len(non_none) == 1:
-                return f"{_format_field_type(non_none[0])}?"
+        non_none = [a for a in args if a is not type(None)]
+        rendered = " | ".join(_format_field_type(a) for a in non_none)
+        if len(non_none) == len(args):
+            return rendered
+        return f"{rendered}?" if len(non_none) == 1 else f"({rendered})?"
     
     if get_origin(field_type) is list or get_origin(field_type) is typing.List:
         args = get_args(field_type)
@@ -20,6 +24,12 @@ def _format_field_type(field_type) -> str:
             return f"List[{_format_field_type(args[0])}]"
         return "List"
 
+    if get_origin(field_type) is dict:
+        args = get_args(field_type)
+        if args:
+            return f"Dict[{_format_field_type(args[0])}, {_format_field_type(args[1])}]"
+        return "Dict"
+
     if get_origin(field_type) is Literal:
         return str(get_args(field_type))
 
@@ -28,15 +38,21 @@ def _format_field_type(field_type) -> str:
     
     return str(field_type)
 
+@lru_cache(maxsize=256)
+def _literal_args(annotation) -> tuple:
+    """The values of a Literal annotation, or () for anything else."""
+    return get_args(annotation) if get_origin(annotation) is Literal else ()
+
 def _generate_sig_from_model(tool_name: str, model_cls: Type[BaseModel]) -> str:
     """Generates a single line signature from a flat BaseModel."""
     parts = []
     schema = model_cls.model_fields
     
     for name, field in schema.items():
-        if name == "operation" and get_origin(field.annotation) is Literal:
+        literal_args = _literal_args(field.annotation) if name == "operation" else ()
+        if literal_args:
             
-            val = get_args(field.annotation)[0]
+            val = literal_args[0]
             parts.insert(0, f"operation='{val}'") 
             continue
             
@@ -55,24 +71,31 @@ def get_tool_signatures(tool_map: dict[str, Type[BaseModel]]) -> str:
         tool_map: Dict mapping function name to Input Model
                   e.g., {"valuation_tool": AnyValuationInput}
     """
+    return _build_tool_signatures(tuple(tool_map.items()))
+
+@lru_cache(maxsize=8)
+def _build_tool_signatures(tool_items: tuple) -> str:
+    """Builds the cheat sheet for (tool_name, model) pairs; cached so re-imports don't re-walk the models."""
+    return "\n".join(_tool_signature_block(tool_name, model_cls) for tool_name, model_cls in tool_items)
+
+def _tool_signature_block(tool_name: str, model_cls: Type[BaseModel]) -> str:
+    """Signature line(s) for one tool: one per union member for RootModel unions, else one."""
     signatures = []
-    
-    for tool_name, model_cls in tool_map.items():
-        if issubclass(model_cls, RootModel):
-            root_field = model_cls.model_fields["root"]
-            annotation = root_field.annotation
-            
-            if get_origin(annotation) is Union:
-                sub_models = get_args(annotation)
-                for sub in sub_models:
-                    
-                    signatures.append(_generate_sig_from_model(tool_name, sub))
-            else:
-                # Fallback if RootModel isn't a Union
-                signatures.append(_generate_sig_from_model(tool_name, model_cls))
+    if issubclass(model_cls, RootModel):
+        root_field = model_cls.model_fields["root"]
+        annotation = root_field.annotation
+        
+        if get_origin(annotation) is Union:
+            sub_models = get_args(annotation)
+            for sub in sub_models:
                 
-        # CASE 2: Standard Flat Model (The Ratio Pattern)
+                signatures.append(_generate_sig_from_model(tool_name, sub))
         else:
+            # Fallback if RootModel isn't a Union
             signatures.append(_generate_sig_from_model(tool_name, model_cls))
             
-    return "\n".join(signatures)
\ No newline at end of file
+    # CASE 2: Standard Flat Model (The Ratio Pattern)
+    else:
+        signatures.append(_generate_sig_from_model(tool_name, model_cls))
+
+    return "\n".join(signatures)
@@ -1,20 +1,24 @@
 import os
-import json
+import logging
 from typing import List, Dict, Any
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from agent_tools.tool_valuation import AnyValuationInput
-from agent_tools.tool_ratio import RatioInput
-from tool_executor import CalculatorInput, AnyDataFetchingInput
+from agent_tools.tool_ratio import RatioInput, RATIO_FIELDS
+from tool_executor import CalculatorInput, AnyDataFetchingInput, TableQABatchInput, TOOL_ID
 from tool_loader import get_tool_signatures
+from state import PlannedCall
+
+logger = logging.getLogger(__name__)
 
 TOOL_DEFINITIONS = {
     "valuation_tool": AnyValuationInput,
     "ratio_calculator": RatioInput,
     "calculator": CalculatorInput,
     "data_fetching_tool": AnyDataFetchingInput,
+    "table_qa_batch_tool": TableQABatchInput,
 }
 
 tool_schema_str = get_tool_signatures(TOOL_DEFINITIONS)
@@ -36,9 +40,13 @@ AVAILABLE TOOLS:
 
 CRITICAL RULES:
 1. **Extraction:** You MUST extract exact values from the user query.
-2. **JSON Format:** You MUST provide the arguments as a **valid JSON string** in the `args_json` field.
-3. **No Empty Args:** The JSON string must NOT represent an empty dictionary `{{}}`.
+2. **JSON Format:** You MUST provide the arguments as a **JSON object** in the `args` field.
+3. **No Empty Args:** The `args` object must NOT be an empty dictionary `{{}}`.
 4. **Valuation Tool:** You MUST provide the `operation` key (e.g., 'npv', 'wacc').
+5. **Ratio Calculator:** Put the numbers under `values`, keyed by: {", ".join(RATIO_FIELDS)}.
+   e.g. {{"ratio_name": "roe", "values": {{"net_income": 120.0, "total_equity": 800.0}}}}
+6. **No Wrapping:** Do NOT wrap arguments in a 'tool_input', 'input' or 'arguments' key — emit the fields at the top level of `args`.
+7. **Table QA:** Use `table_qa_batch_tool` only when the query names a table's `csv_path`; put every question about that table in one `queries` list.
 
 EXAMPLE:
 User: "Calculate NPV for cash flows -100, 50, 60 at 10% rate."
@@ -49,72 +57,71 @@ Output:
     {{
       "reasoning": "Extracted cash_flows [-100, 50, 60] and discount_rate 0.10",
       "tool_name": "valuation_tool",
-      "args_json": "{{\\"operation\\": \\"npv\\", \\"cash_flows\\": [-100.0, 50.0, 60.0], \\"discount_rate\\": 0.10}}"
+      "args": {{"operation": "npv", "cash_flows": [-100.0, 50.0, 60.0], "discount_rate": 0.10}}
     }}
   ]
 }}
 """
 
 class ToolCall(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     reasoning: str = Field(description="Explain what values you extracted")
     tool_name: str = Field(description="Exact tool name")
-    args_json: str = Field(description="The arguments as a valid JSON string. Example: '{\"key\": \"value\"}'")
+    args: Dict[str, Any] = Field(description="Tool arguments as a JSON object")
 
 class ToolPlan(BaseModel):
     steps: List[ToolCall]
 
+# Built once: the structured-output binding and the (multi-KB) system prompt are the same every call.
+# json_schema mode lets Gemini emit the free-form args object directly. Binding the JSON schema
+# rather than the model class returns the plan as plain dicts; the executor validates each
+# tool's args anyway, so building ToolPlan/ToolCall instances would be a second pass.
+_PLANNER_LLM = _llm.with_structured_output(ToolPlan.model_json_schema(), method="json_schema")
+_SYSTEM_MSG = SystemMessage(content=SYSTEM_PROMPT)
+
 def tool_planner(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("--- TOOL PLANNER: Analyzing state ---")
+    logger.info("TOOL PLANNER: Analyzing state")
 
     query = state.get("query", "")
     if not query:
         return {"tool_calls": []}
 
-    planner_llm = _llm.with_structured_output(ToolPlan)
-
     messages = [
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=f"Query: {query}"),
+        _SYSTEM_MSG,
+        HumanMessage(content=query),
     ]
 
     try:
-        print("--- TOOL PLANNER: Invoking LLM ---")
-        plan = planner_llm.invoke(messages)
-        print("--- TOOL PLANNER: LLM Responded ---")
+        logger.debug("TOOL PLANNER: Invoking LLM")
+        plan = _PLANNER_LLM.invoke(messages)
+        logger.debug("TOOL PLANNER: LLM Responded")
 
-        if not plan or not plan.steps:
-            print("--- TOOL PLANNER: No steps returned ---")
+        steps = (plan or {}).get("steps")
+        if not steps:
+            logger.info("TOOL PLANNER: No steps returned")
             return {"tool_calls": []}
 
         valid_steps = []
 
-        for step in plan.steps:
-            
-            try:
-                parsed_args = json.loads(step.args_json)
-            except json.JSONDecodeError:
-                print(f"!!! Error parsing JSON for {step.tool_name}: {step.args_json}")
-                continue 
+        for step in steps:
+            tool_name = step.get("tool_name")
+            parsed_args = step.get("args")
 
-            print(f"    [Plan] {step.tool_name}")
-            print(f"           Reasoning: {step.reasoning}")
-            print(f"           Args: {parsed_args}")
+            logger.debug("[Plan] %s | Reasoning: %s | Args: %s", tool_name, step.get("reasoning"), parsed_args)
 
             if not parsed_args or not isinstance(parsed_args, dict):
-                print("    [Planner Warning] Empty or invalid args. Skipping tool call.")
+                logger.warning("Empty or invalid args for %s. Skipping tool call.", tool_name)
                 continue
 
-            valid_steps.append({
-                "tool_name": step.tool_name,
-                "args": parsed_args, # We store the PARSED dict for the Executor
-            })
+            valid_steps.append(PlannedCall(tool_name, TOOL_ID.get(tool_name), parsed_args))
 
         if not valid_steps:
-            print("--- TOOL PLANNER: No valid tool calls after validation ---")
+            logger.info("TOOL PLANNER: No valid tool calls after validation")
             return {"tool_calls": []}
 
         return {"tool_calls": valid_steps}
 
     except Exception as e:
-        print(f"--- TOOL PLANNER ERROR: {e} ---")
+        logger.warning("TOOL PLANNER ERROR: %s", e)
         return {"tool_calls": []}
\ No newline at end of file